@@ -0,0 +1,440 @@
+import argparse
+import itertools
+import json
+import operator
+import re
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from functools import lru_cache
+from journal import EVENT_CODES, RECORD, JournalReader, default_history_path
+try:
+    import numpy
+except ImportError:  # optional: the array fallback gives the same results, only slower
+    numpy = None
+
+# Records decoded per batch (2 MiB of journal); memory use does not grow with the file
+BATCH_RECORDS = 1 << 16
+# A work period or break still open at the end of a batch is carried into the
+# next one, unless it has more records than this (e.g. a journal cut off mid-day)
+MAX_CARRY = 4096
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+SHADES = " .:-=+*#%@"
+# Break length relative to the configured one: cut short / kept / overran
+ADHERENCE_BOUNDS = (0.9, 1.1)
+
+# Column name, offset in RECORD, array typecode, NumPy type
+COLUMNS = (
+    ('time', 0, 'd', '<f8'),
+    ('event', 8, 'B', 'u1'),
+    ('snoozes', 9, 'B', 'u1'),
+    ('session', 10, 'H', '<u2'),
+    ('phase', 12, 'H', '<u2'),
+    ('duration', 14, 'I' if array('I').itemsize == 4 else 'L', '<u4'),
+)
+if numpy is not None:
+    RECORD_DTYPE = numpy.dtype({
+        'names': [name for name, _, _, _ in COLUMNS],
+        'formats': [dtype for _, _, _, dtype in COLUMNS],
+        'offsets': [offset for _, offset, _, _ in COLUMNS],
+        'itemsize': RECORD.size,
+    })
+
+
+def _codes(*names):
+    return bytes(EVENT_CODES[name] for name in names)
+
+
+FOCUS_YES = _codes("focus_yes")
+FOCUS_NO = _codes("focus_no")
+SNOOZE_YES = _codes("snooze_yes")
+SNOOZE_NO = _codes("snooze_no")
+PHASE_STARTS = _codes("phase_started")
+SNOOZE_STARTS = _codes("snooze_started")
+BREAK_STARTS = _codes("break_started")
+# Events that end a work phase or snooze, and events that end a break
+WORK_ENDS = _codes("focus_check", "snooze_prompt", "break_pending", "break_started", "stopped",
+                   "session_selected", "phase_selected", "seeked", "finished")
+BREAK_ENDS = _codes("phase_started", "session_started", "stopped", "session_selected",
+                    "phase_selected", "seeked", "finished")
+
+
+def decode(buf):
+    """Split raw journal records into columns.
+
+    With NumPy the columns are strided views of `buf`; otherwise each one
+    is gathered with a few slice copies into an array (the event column
+    into bytes, so it can be scanned with bytes.translate and re).
+    """
+    if numpy is not None:
+        records = numpy.frombuffer(buf, dtype=RECORD_DTYPE)
+        return {name: records[name] for name, _, _, _ in COLUMNS}
+    count = len(buf) // RECORD.size
+    columns = {'event': bytes(buf[8::RECORD.size])}
+    for name, offset, typecode, _ in COLUMNS:
+        if name == 'event':
+            continue
+        column = array(typecode)
+        size = column.itemsize
+        data = bytearray(count * size)
+        for byte in range(size):
+            data[byte::size] = buf[offset + byte::RECORD.size]
+        column.frombytes(data)
+        if sys.byteorder == 'big':
+            column.byteswap()
+        columns[name] = column
+    return columns
+
+
+@lru_cache(maxsize=None)
+def _table(codes):
+    table = bytearray(256)
+    for code in codes:
+        table[code] = 1
+    return bytes(table)
+
+
+@lru_cache(maxsize=None)
+def _pair_patterns(starts, ends):
+    start_class = b'[' + re.escape(starts) + b']'
+    other_class = b'[^' + re.escape(starts + ends) + b']'
+    return (re.compile(start_class + other_class + b'*[' + re.escape(ends) + b']'),
+            re.compile(start_class + other_class + b'*\\Z'))
+
+
+def positions(events, codes, first=0):
+    """Indices (from `first` on) of the records whose event is one of `codes`"""
+    if numpy is not None:
+        return numpy.flatnonzero(numpy.isin(events[first:], list(codes))) + first
+    return list(itertools.compress(range(first, len(events)), events[first:].translate(_table(codes))))
+
+
+def pairs(events, starts, ends):
+    """Match every start event with the end event that follows it.
+
+    A start followed by another start before any end is dropped. Returns
+    the start and end indices, and the index of a trailing start that is
+    still open at the end of `events` (or None).
+    """
+    if numpy is not None:
+        is_start = numpy.isin(events, list(starts))
+        marks = numpy.flatnonzero(is_start | numpy.isin(events, list(ends)))
+        kinds = is_start[marks]
+        matched = kinds[:-1] & ~kinds[1:]
+        open_start = int(marks[-1]) if len(marks) and kinds[-1] else None
+        return marks[:-1][matched], marks[1:][matched], open_start
+    pattern, open_pattern = _pair_patterns(starts, ends)
+    first, last = [], []
+    for match in pattern.finditer(events):
+        first.append(match.start())
+        last.append(match.end() - 1)
+    match = open_pattern.search(events)
+    return first, last, match.start() if match else None
+
+
+def take(column, indices):
+    if numpy is not None:
+        return column[indices]
+    return list(map(column.__getitem__, indices))
+
+
+def subtract(a, b):
+    if numpy is not None:
+        return a - b
+    return list(map(operator.sub, a, b))
+
+
+def ratio(a, b):
+    if numpy is not None:
+        return a / numpy.maximum(b, 1)
+    return [x / max(y, 1) for x, y in zip(a, b)]
+
+
+def bucket(values, bounds):
+    if numpy is not None:
+        return numpy.searchsorted(bounds, values, side='right')
+    return [bisect_right(bounds, value) for value in values]
+
+
+def week_slots(times, rows, zones):
+    """weekday * 24 + local hour of the records at `rows`.
+
+    `zones` lists (first record, UTC offset in seconds) in record order;
+    each offset holds until the next entry.
+    """
+    firsts = [first for first, _ in zones]
+    offsets = [offset for _, offset in zones]
+    if numpy is not None:
+        local = times[rows] + numpy.asarray(offsets)[numpy.searchsorted(firsts, rows, side='right') - 1]
+        # Day 0 of the epoch was a Thursday
+        return ((local // 86400 + 3) % 7 * 24 + local % 86400 // 3600).astype(numpy.intp)
+    slots = []
+    for row in rows:
+        local = times[row] + offsets[bisect_right(firsts, row) - 1]
+        slots.append(int(local // 86400 + 3) % 7 * 24 + int(local % 86400 // 3600))
+    return slots
+
+
+def count_by(keys, weights=None):
+    """{key: number of occurrences, or sum of the matching weights}"""
+    if numpy is not None:
+        counts = numpy.bincount(keys, weights)
+        present = numpy.flatnonzero(counts)
+        return dict(zip(present.tolist(), counts[present].tolist()))
+    if weights is None:
+        return Counter(keys)
+    totals = Counter()
+    for key, weight in zip(keys, weights):
+        totals[key] += weight
+    return totals
+
+
+def total(values):
+    return float(values.sum()) if numpy is not None else float(sum(values))
+
+
+class HistoryReport:
+    """Productivity statistics accumulated batch by batch.
+
+    add_batch() works on whole columns: rows are selected with NumPy masks
+    or, without NumPy, with bytes.translate/itertools.compress and regular
+    expressions over the event column, so Python code only runs per
+    matched event, never per record. Work periods and breaks are timed on
+    the wall clock from their start event to the event that ends them, so
+    pauses and slow answers to prompts count as part of them.
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.first_time = None
+        self.last_time = None
+        self.focus_yes = Counter()
+        self.focus_no = Counter()
+        self.sessions = Counter()
+        self.session_snoozes = Counter()
+        self.snooze_counts = Counter()
+        self.snooze_yes = 0
+        self.snooze_no = 0
+        self.phases = Counter()
+        self.phase_actual = Counter()
+        self.phase_configured = Counter()
+        self.break_buckets = Counter()
+        self.break_actual = 0.0
+        self.break_configured = 0.0
+        self.heatmap = Counter()
+
+    def add_batch(self, buf, carried=0, day_starts=()):
+        """Account for the records in `buf`, the first `carried` of which
+        were already counted in the previous batch, and return the index of
+        the first record to carry into the next batch, or None.
+
+        `day_starts` are the indices of records that begin a local day; the
+        UTC offset is looked up once per day rather than per record.
+        """
+        columns = decode(buf)
+        events, times = columns['event'], columns['time']
+        if len(events) == carried:
+            return None
+        if self.first_time is None:
+            self.first_time = float(times[0])
+        self.last_time = float(times[-1])
+        self.records += len(events) - carried
+        zones = []
+        for row in (0, *day_starts):
+            offset = time.localtime(float(times[row])).tm_gmtoff
+            if not zones or zones[-1][1] != offset:
+                zones.append((row, offset))
+
+        for codes, counts in ((FOCUS_YES, self.focus_yes), (FOCUS_NO, self.focus_no)):
+            counts.update(count_by(take(columns['phase'], positions(events, codes, carried))))
+
+        # The snooze count is only reset when the next session starts, so
+        # at break_started it holds the snoozes taken in the session
+        ends = positions(events, BREAK_STARTS, carried)
+        sessions = take(columns['session'], ends)
+        snoozes = take(columns['snoozes'], ends)
+        self.sessions.update(count_by(sessions))
+        self.session_snoozes.update(count_by(sessions, snoozes))
+        self.snooze_counts.update(count_by(snoozes))
+        self.snooze_yes += len(positions(events, SNOOZE_YES, carried))
+        self.snooze_no += len(positions(events, SNOOZE_NO, carried))
+
+        # Pairs start at or after the first carried record, which was still
+        # open at the end of the previous batch, so none is counted twice
+        starts, ends, open_phase = pairs(events, PHASE_STARTS, WORK_ENDS)
+        phases = take(columns['phase'], starts)
+        actual = subtract(take(times, ends), take(times, starts))
+        self.phases.update(count_by(phases))
+        self.phase_actual.update(count_by(phases, actual))
+        self.phase_configured.update(count_by(phases, take(columns['duration'], starts)))
+        self.heatmap.update(count_by(week_slots(times, starts, zones), actual))
+
+        starts, ends, open_snooze = pairs(events, SNOOZE_STARTS, WORK_ENDS)
+        actual = subtract(take(times, ends), take(times, starts))
+        self.heatmap.update(count_by(week_slots(times, starts, zones), actual))
+
+        starts, ends, open_break = pairs(events, BREAK_STARTS, BREAK_ENDS)
+        actual = subtract(take(times, ends), take(times, starts))
+        configured = take(columns['duration'], starts)
+        self.break_buckets.update(count_by(bucket(ratio(actual, configured), ADHERENCE_BOUNDS)))
+        self.break_actual += total(actual)
+        self.break_configured += total(configured)
+
+        open_starts = [index for index in (open_phase, open_snooze, open_break) if index is not None]
+        if not open_starts or len(events) - min(open_starts) > MAX_CARRY:
+            return None
+        return min(open_starts)
+
+    def as_dict(self):
+        phases = sorted(set(self.phases) | set(self.focus_yes) | set(self.focus_no))
+        breaks = sum(self.break_buckets.values())
+        return {
+            'records': self.records,
+            'first': self.first_time,
+            'last': self.last_time,
+            'phases': [{
+                'phase': phase + 1,
+                'focus_answers': self.focus_yes[phase] + self.focus_no[phase],
+                'focus_yes_rate': _rate(self.focus_yes[phase],
+                                        self.focus_yes[phase] + self.focus_no[phase]),
+                'count': self.phases[phase],
+                'configured_minutes': _rate(self.phase_configured[phase], self.phases[phase] * 60),
+                'actual_minutes': _rate(self.phase_actual[phase], self.phases[phase] * 60),
+            } for phase in phases],
+            'sessions': [{
+                'session': session + 1,
+                'completed': self.sessions[session],
+                'mean_snoozes': _rate(self.session_snoozes[session], self.sessions[session]),
+            } for session in sorted(self.sessions)],
+            'snoozes_per_session': {str(count): sessions for count, sessions
+                                    in sorted(self.snooze_counts.items())},
+            'snooze_prompts': self.snooze_yes + self.snooze_no,
+            'snooze_yes_rate': _rate(self.snooze_yes, self.snooze_yes + self.snooze_no),
+            'breaks': {
+                'count': breaks,
+                'mean_actual_minutes': _rate(self.break_actual, breaks * 60),
+                'mean_configured_minutes': _rate(self.break_configured, breaks * 60),
+                'cut_short': self.break_buckets[0],
+                'kept': self.break_buckets[1],
+                'overran': self.break_buckets[2],
+            },
+            'work_minutes_by_weekday_hour': [
+                [round(self.heatmap[day * 24 + hour] / 60, 1) for hour in range(24)]
+                for day in range(7)
+            ],
+        }
+
+    def render(self):
+        if not self.records:
+            return "No history recorded yet"
+        data = self.as_dict()
+        first, last = (time.strftime('%Y-%m-%d', time.localtime(t)) for t in (data['first'], data['last']))
+        lines = [f"{data['records']} records from {first} to {last}", "",
+                 "Phase  focus checks  focused  phases  configured  actual (wall clock)"]
+        for row in data['phases']:
+            lines.append(f"{row['phase']:5}  {row['focus_answers']:12}  {_percent(row['focus_yes_rate']):>7}"
+                         f"  {row['count']:6}  {_minutes(row['configured_minutes']):>10}"
+                         f"  {_minutes(row['actual_minutes']):>7}")
+        lines += ["", "Session  completed  snoozes (mean)"]
+        for row in data['sessions']:
+            lines.append(f"{row['session']:7}  {row['completed']:9}  {row['mean_snoozes'] or 0:14.2f}")
+        completed = sum(self.snooze_counts.values())
+        if completed:
+            lines.append("Snoozes per session: " + ", ".join(
+                f"{count}: {_percent(sessions / completed)}" for count, sessions in sorted(self.snooze_counts.items())))
+        if data['snooze_prompts']:
+            lines.append(f"Snooze prompts: {data['snooze_prompts']}, "
+                         f"{_percent(data['snooze_yes_rate'])} accepted")
+        breaks = data['breaks']
+        lines.append("")
+        if breaks['count']:
+            lines.append(
+                f"Breaks: {breaks['count']}, mean {_minutes(breaks['mean_actual_minutes'])} of "
+                f"{_minutes(breaks['mean_configured_minutes'])} configured; "
+                f"{_percent(breaks['cut_short'] / breaks['count'])} cut short, "
+                f"{_percent(breaks['kept'] / breaks['count'])} kept, "
+                f"{_percent(breaks['overran'] / breaks['count'])} overran")
+        else:
+            lines.append("Breaks: none finished")
+        busiest = max(self.heatmap.values(), default=0)
+        lines += ["", "Work by weekday and hour (darker is more)", "     0     6     12    18"]
+        for day, name in enumerate(WEEKDAYS):
+            row = (self.heatmap[day * 24 + hour] for hour in range(24))
+            lines.append(f"{name}  " + "".join(
+                SHADES[min(int(value / busiest * len(SHADES)), len(SHADES) - 1)] if busiest else " "
+                for value in row))
+        return "\n".join(lines)
+
+
+def _rate(part, whole):
+    return part / whole if whole else None
+
+
+def _percent(value):
+    return "-" if value is None else f"{value * 100:.1f}%"
+
+
+def _minutes(value):
+    return "-" if value is None else f"{value:.1f} min"
+
+
+def batches(reader, batch_records=BATCH_RECORDS):
+    """(start, stop, day starts) for consecutive ranges of at most `batch_records`
+    records; day starts come from the journal's per-day index"""
+    count = len(reader)
+    day_starts = sorted(start for start, _ in reader.days().values())
+    for start in range(0, count, batch_records):
+        stop = min(start + batch_records, count)
+        yield start, stop, day_starts[bisect_left(day_starts, start):bisect_left(day_starts, stop)]
+
+
+def analyze(path, batch_records=BATCH_RECORDS):
+    """Stream the journal at `path` through a HistoryReport"""
+    report = HistoryReport()
+    reader = JournalReader(path)
+    carry = b''
+    try:
+        for start, stop, day_starts in batches(reader, batch_records):
+            view = reader.view(start, stop)
+            try:
+                buf = carry + view if carry else view
+                carried = len(carry) // RECORD.size
+                keep = report.add_batch(buf, carried, [carried + row - start for row in day_starts])
+                carry = b'' if keep is None else bytes(buf[keep * RECORD.size:])
+                del buf
+            finally:
+                view.release()
+    finally:
+        reader.close()
+    return report
+
+
+def print_report(path, as_json=False):
+    """Print statistics for the journal at `path`; return the exit status"""
+    if not path:
+        print("Error: history is disabled (--no-history)")
+        return 1
+    try:
+        start = time.perf_counter()
+        report = analyze(path)
+    except FileNotFoundError:
+        print(f"Error: no history at '{path}'")
+        return 1
+    if as_json:
+        print(json.dumps(report.as_dict(), indent=2))
+        return 0
+    print(report.render())
+    elapsed = time.perf_counter() - start
+    print(f"\nAnalyzed in {elapsed:.2f} s ({'NumPy' if numpy is not None else 'array'} backend)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Productivity statistics from the session history')
+    parser.add_argument('--history', default=default_history_path(),
+                        help='Session history journal (default: %(default)s)')
+    parser.add_argument('--json', action='store_true', help='Print the statistics as JSON')
+    args = parser.parse_args()
+    sys.exit(print_report(args.history, args.json))
@@ -0,0 +1,274 @@
+import argparse
+import fcntl
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+from array import array
+from collections import deque
+try:
+    import sounddevice
+except ImportError:  # optional: a persistent pacat/pw-cat/aplay pipe is used instead
+    sounddevice = None
+
+RATE = 44100
+CHANNELS = 2
+# Frames per mixed block (~6 ms); new cues start at the next block
+BLOCK = 256
+SOUND_FILES = {"gong": "gong.wav", "pling": "pling.wav"}
+
+# Raw s16le stereo players that keep one stream open while fed from stdin
+PLAYERS = (
+    ('pw-cat', ['--playback', '--format', 's16', '--rate', str(RATE), '--channels', str(CHANNELS),
+                '--latency', '20ms', '-']),
+    ('pacat', ['--raw', '--format=s16le', f'--rate={RATE}', f'--channels={CHANNELS}',
+               '--latency-msec=20']),
+    ('aplay', ['-q', '-t', 'raw', '-f', 'S16_LE', '-r', str(RATE), '-c', str(CHANNELS),
+               '--buffer-time=40000']),
+)
+
+
+def decode(path):
+    """Read a 16-bit WAV into interleaved stereo samples at RATE"""
+    with wave.open(path, 'rb') as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"'{path}' is not 16-bit PCM")
+        channels, rate = f.getnchannels(), f.getframerate()
+        samples = array('h', f.readframes(f.getnframes()))
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    if channels == 1:
+        stereo = array('h', bytes(len(samples) * 4))
+        stereo[0::2] = samples
+        stereo[1::2] = samples
+        samples = stereo
+    elif channels != CHANNELS:
+        raise ValueError(f"'{path}' has {channels} channels")
+    if rate != RATE:
+        samples = resample(samples, rate)
+    return samples
+
+
+def resample(samples, rate):
+    """Linear-interpolation resampling of interleaved stereo to RATE"""
+    frames = len(samples) // CHANNELS
+    out_frames = frames * RATE // rate
+    step = rate / RATE
+    left, right = samples[0::2], samples[1::2]
+    out = array('h', bytes(out_frames * CHANNELS * 2))
+    last = frames - 1
+    for i in range(out_frames):
+        pos = i * step
+        j = int(pos)
+        frac = pos - j
+        k = j + 1 if j < last else j
+        out[2 * i] = int(left[j] + (left[k] - left[j]) * frac)
+        out[2 * i + 1] = int(right[j] + (right[k] - right[j]) * frac)
+    return out
+
+
+class NullSink:
+    """Discards audio; used for silent and headless runs"""
+
+    name = "silent"
+
+    def write(self, data):
+        pass
+
+    def close(self):
+        pass
+
+
+class PipeSink:
+    """One long-lived command-line player fed raw PCM through a small pipe"""
+
+    def __init__(self, name, args):
+        self.name = name
+        self.proc = subprocess.Popen([shutil.which(name)] + args, stdin=subprocess.PIPE,
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            # Keep at most a few blocks in flight so overlapping cues mix in promptly
+            fcntl.fcntl(self.proc.stdin.fileno(), fcntl.F_SETPIPE_SZ, 4096)
+        except (AttributeError, OSError):
+            pass
+
+    def write(self, data):
+        self.proc.stdin.write(data)
+        self.proc.stdin.flush()
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        self.proc.terminate()
+
+
+class SoundDeviceSink:
+    """PortAudio output stream through the optional sounddevice package"""
+
+    name = "sounddevice"
+
+    def __init__(self):
+        self.stream = sounddevice.RawOutputStream(samplerate=RATE, channels=CHANNELS, dtype='int16',
+                                                  blocksize=BLOCK, latency='low')
+        self.stream.start()
+
+    def write(self, data):
+        self.stream.write(data)
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
+
+
+def open_sink():
+    if sounddevice is not None:
+        try:
+            return SoundDeviceSink()
+        except Exception as e:
+            print(f"Warning: sounddevice output unavailable: {e}")
+    for name, args in PLAYERS:
+        if shutil.which(name):
+            return PipeSink(name, args)
+    print("Warning: no audio output found (install sounddevice, pipewire, pulseaudio-utils "
+          "or alsa-utils); sounds are disabled")
+    return NullSink()
+
+
+class Voice:
+    __slots__ = ('samples', 'pos', 'triggered_at')
+
+    def __init__(self, samples, triggered_at):
+        self.samples = samples
+        self.pos = 0
+        self.triggered_at = triggered_at
+
+
+class AudioEngine:
+    """Plays cues from PCM decoded once, mixed into one persistent output stream.
+
+    play() only appends a voice under a lock, so it is safe and O(1) from
+    any thread. A mixer thread decodes the WAVs on startup, opens the
+    output once, and while cues are playing writes BLOCK-frame chunks in
+    which overlapping cues are summed with clipping; when nothing plays it
+    sleeps. Trigger-to-playback latency is measured from play() to the
+    write of the first block containing the cue.
+    """
+
+    def __init__(self, sounds=SOUND_FILES, silent=False):
+        self.sounds = sounds
+        self.silent = silent
+        self.buffers = {}
+        self.sink = None
+        self.latencies = deque(maxlen=100)
+        self.played = 0
+        self._voices = []
+        self._cond = threading.Condition()
+        self._ready = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audio-mixer", daemon=True)
+        self._thread.start()
+
+    def play(self, name):
+        with self._cond:
+            self._voices.append((name, time.perf_counter()))
+            self._cond.notify()
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def _load(self):
+        for name, path in self.sounds.items():
+            try:
+                self.buffers[name] = decode(path)
+            except (OSError, EOFError, wave.Error, ValueError) as e:
+                print(f"Warning: cannot load sound '{path}': {e}")
+        self.sink = NullSink() if self.silent else open_sink()
+        self._ready.set()
+
+    def _run(self):
+        self._load()
+        playing = []
+        block_samples = BLOCK * CHANNELS
+        while True:
+            with self._cond:
+                while not self._voices and not playing and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    break
+                new, self._voices = self._voices, []
+            for name, triggered_at in new:
+                samples = self.buffers.get(name, self.buffers.get("pling"))
+                if samples is not None:
+                    playing.append(Voice(samples, triggered_at))
+            if not playing:
+                continue
+            if isinstance(self.sink, NullSink):
+                # Nothing to hear: account for the cues without mixing them
+                now = time.perf_counter()
+                self.latencies.extend(now - voice.triggered_at for voice in playing)
+                self.played += len(playing)
+                playing = []
+                continue
+            block = self._mix(playing, block_samples)
+            try:
+                self.sink.write(block.tobytes())
+            except (OSError, ValueError) as e:
+                print(f"Warning: audio output failed, sounds are disabled: {e}")
+                self.sink = NullSink()
+            now = time.perf_counter()
+            for voice in playing:
+                if voice.pos == 0:
+                    self.latencies.append(now - voice.triggered_at)
+                    self.played += 1
+                voice.pos += block_samples
+            playing = [voice for voice in playing if voice.pos < len(voice.samples)]
+        self.sink.close()
+
+    @staticmethod
+    def _mix(playing, block_samples):
+        first = playing[0]
+        block = first.samples[first.pos:first.pos + block_samples]
+        if len(block) < block_samples:
+            block.extend(array('h', bytes((block_samples - len(block)) * 2)))
+        for voice in playing[1:]:
+            chunk = voice.samples[voice.pos:voice.pos + block_samples]
+            for i, sample in enumerate(chunk):
+                mixed = block[i] + sample
+                block[i] = 32767 if mixed > 32767 else -32768 if mixed < -32768 else mixed
+        return block
+
+    def summary(self):
+        output = self.sink.name if self.sink is not None else "starting"
+        if not self.latencies:
+            return f"{output}, no cues played"
+        mean = sum(self.latencies) / len(self.latencies)
+        return (f"{output}, {self.played} cues, trigger-to-playback mean {mean * 1000:.2f} ms, "
+                f"max {max(self.latencies) * 1000:.2f} ms")
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Play the bundled cues and report latency')
+    parser.add_argument('--silent', action='store_true', help='Mix without an audio device')
+    parser.add_argument('cues', nargs='*', default=['gong', 'pling', 'pling'],
+                        help='Cues to trigger 100 ms apart (default: gong pling pling)')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    engine = AudioEngine(silent=args.silent)
+    engine.wait_ready()
+    print(f"Decoded {len(engine.buffers)} sounds in {(time.perf_counter() - start) * 1000:.0f} ms")
+    for cue in args.cues:
+        engine.play(cue)
+        time.sleep(0.1)
+    time.sleep(0.5)
+    print(f"Audio: {engine.summary()}")
+    engine.close()
@@ -0,0 +1,145 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from timer_engine import STATES
+
+MAGIC = b'DWTC'
+# magic, state, paused, running, session, work_phase, snooze_count,
+# phase_duration, phase_elapsed, session_elapsed, total_work_elapsed, saved_at
+RECORD = struct.Struct('<4sBBBHHHIdddd')
+CRC = struct.Struct('<I')
+
+
+def default_checkpoint_path():
+    state_home = os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    return os.path.join(state_home, 'dynamictimer', 'checkpoint.bin')
+
+
+class TimerState:
+    """Everything needed to continue a day exactly where it was left"""
+
+    __slots__ = (
+        'state', 'paused', 'running', 'session', 'work_phase', 'snooze_count',
+        'phase_duration', 'phase_elapsed', 'session_elapsed', 'total_work_elapsed', 'saved_at'
+    )
+
+    def __init__(self, state, paused, running, session, work_phase, snooze_count,
+                 phase_duration, phase_elapsed, session_elapsed, total_work_elapsed, saved_at):
+        self.state = state
+        self.paused = paused
+        self.running = running
+        self.session = session
+        self.work_phase = work_phase
+        self.snooze_count = snooze_count
+        self.phase_duration = phase_duration
+        self.phase_elapsed = phase_elapsed
+        self.session_elapsed = session_elapsed
+        self.total_work_elapsed = total_work_elapsed
+        self.saved_at = saved_at
+
+    def pack(self):
+        data = RECORD.pack(
+            MAGIC, STATES.index(self.state), self.paused, self.running, self.session,
+            self.work_phase, self.snooze_count, self.phase_duration, self.phase_elapsed,
+            self.session_elapsed, self.total_work_elapsed, self.saved_at
+        )
+        return data + CRC.pack(zlib.crc32(data))
+
+    @classmethod
+    def unpack(cls, data):
+        if len(data) != RECORD.size + CRC.size:
+            raise ValueError("checkpoint has the wrong size")
+        body = data[:RECORD.size]
+        if CRC.unpack_from(data, RECORD.size)[0] != zlib.crc32(body):
+            raise ValueError("checkpoint checksum mismatch")
+        magic, state, *fields = RECORD.unpack(body)
+        if magic != MAGIC:
+            raise ValueError("not a timer checkpoint")
+        paused, running, *rest = fields
+        return cls(STATES[state], bool(paused), bool(running), *rest)
+
+
+def snapshot(engine):
+    """Capture the engine's position as a TimerState"""
+    return TimerState(
+        engine.state, engine.paused, engine.active, engine.session, engine.work_phase,
+        engine.snooze_count, engine.current_phase_duration, engine.phase_elapsed,
+        engine.session_elapsed, engine.total_work_elapsed, time.time()
+    )
+
+
+def load_checkpoint(path):
+    """Return the TimerState saved at `path`, or None if there is no usable one"""
+    try:
+        with open(path, 'rb') as f:
+            return TimerState.unpack(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Warning: ignoring checkpoint '{path}': {e}")
+        return None
+
+
+class CheckpointWriter:
+    """Writes the latest TimerState atomically from a background thread.
+
+    save() only swaps the pending snapshot under a lock; if several arrive
+    while a write is in progress, only the newest is written. Each write
+    goes to a temporary file that is fsynced and renamed over the old one,
+    so a crash leaves either the previous or the new checkpoint, never a
+    torn one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._cond = threading.Condition()
+        self._pending = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, state):
+        data = state.pack()
+        with self._cond:
+            self._pending = data
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                data, self._pending = self._pending, None
+                closed = self._closed
+            if data is not None:
+                self._write(data)
+            elif closed:
+                return
+
+    def _write(self, data):
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+            self.writes += 1
+        except OSError as e:
+            print(f"Warning: could not write checkpoint '{self.path}': {e}")
+
+    def close(self):
+        """Write any pending snapshot and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
@@ -0,0 +1,150 @@
+import ctypes
+import ctypes.util
+import json
+import numbers
+import os
+import struct
+import sys
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def _number(minimum, integer=False):
+    kind = "an integer" if integer else "a number"
+
+    def check(value):
+        if isinstance(value, bool) or not isinstance(value, numbers.Integral if integer else numbers.Real):
+            return f"must be {kind}"
+        if value < minimum:
+            return f"must be at least {minimum}"
+    return check
+
+
+def _list_of(check_item):
+    def check(value):
+        if not isinstance(value, list) or not value:
+            return "must be a non-empty list"
+        for i, item in enumerate(value):
+            error = check_item(item)
+            if error:
+                return f"item {i} {error}"
+    return check
+
+
+def _boolean(value):
+    if not isinstance(value, bool):
+        return "must be true or false"
+
+
+def _one_of(*choices):
+    def check(value):
+        if value not in choices:
+            return "must be one of " + ", ".join(f"'{choice}'" for choice in choices)
+    return check
+
+
+# key: (required, check); keys not listed here are ignored
+SCHEMA = {
+    'work_phases': (True, _list_of(_number(0.001))),
+    'breaks': (True, _list_of(_number(0))),
+    'snooze_interval': (True, _number(0.001)),
+    'max_snoozes': (True, _number(0, integer=True)),
+    'daily_sessions': (True, _number(1, integer=True)),
+    'max_work': (False, _number(0)),
+    'popup_autoconfirm_seconds': (False, _number(0)),
+    'popup_warning_seconds': (False, _number(0)),
+    'auto_start_breaks': (False, _boolean),
+    'auto_start_sessions': (False, _boolean),
+    'catch_up': (False, _one_of('hold', 'pause', 'replay')),
+}
+
+# The schema compiled once into a flat tuple of checks
+_CHECKS = tuple((key, required, check) for key, (required, check) in SCHEMA.items())
+_REQUIRED = frozenset(key for key, required, _ in _CHECKS if required)
+
+
+def validate_config(config):
+    """Return a list of problems with `config`; empty when it is usable"""
+    if not isinstance(config, dict):
+        return ["top level must be a JSON object"]
+    errors = [f"'{key}' is required" for key in sorted(_REQUIRED - config.keys())]
+    for key, required, check in _CHECKS:
+        if key in config:
+            error = check(config[key])
+            if error:
+                errors.append(f"'{key}' {error}")
+    return errors
+
+
+def read_config(config_path):
+    """Load and validate a config file, raising ConfigError on any problem"""
+    try:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        raise ConfigError(f"Config file '{config_path}' not found")
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"Config file '{config_path}' is not valid JSON: {e}")
+    errors = validate_config(config)
+    if errors:
+        raise ConfigError(f"Config file '{config_path}' is invalid: " + "; ".join(errors))
+    return config
+
+
+def load_config(config_path):
+    try:
+        return read_config(config_path)
+    except ConfigError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+_EVENT = struct.Struct('iIII')
+
+
+class ConfigWatch:
+    """inotify watch on a config file, without any polling.
+
+    Watches the containing directory so editors that save by renaming a
+    temporary file over the original are noticed too. Hand `fd` to the
+    event loop (QSocketNotifier, loop.add_reader) and call changed() when
+    it becomes readable.
+    """
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.path = os.path.abspath(path)
+        self.name = os.fsencode(os.path.basename(self.path))
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(os.path.dirname(self.path)), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"cannot watch '{self.path}'")
+
+    def changed(self):
+        """Drain pending events; True if any of them touched the config file"""
+        touched = False
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return touched
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                touched = touched or name == self.name
+
+    def close(self):
+        os.close(self.fd)
@@ -0,0 +1,193 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import time
+from paths import runtime_dir
+from timer_engine import DONE
+
+# One command per line; every command gets one JSON reply line. After
+# "subscribe", the connection also receives one {"event": ..., "status": ...}
+# line per timer transition. Sessions and phases are numbered from 1, as
+# on the buttons.
+USAGE = ("start | pause | resume | toggle | skip | stop | select-session N | select-phase N"
+         " | seek MINUTES | fast-forward MINUTES | focus [yes|no] | snooze [yes|no] | status"
+         " | subscribe | metrics | trace")
+
+
+class CommandError(ValueError):
+    pass
+
+
+def default_socket_path():
+    return os.path.join(runtime_dir(), 'control.sock')
+
+
+def status(engine):
+    """Snapshot of the timer for clients; `ends_at` lets them count down locally"""
+    remaining = engine.remaining
+    return {
+        'state': engine.state,
+        'paused': engine.paused,
+        'session': engine.session + 1,
+        'sessions': engine.daily_sessions,
+        'phase': engine.work_phase + 1,
+        'phases': engine.total_phases,
+        'snoozes': engine.snooze_count,
+        'max_snoozes': engine.max_snoozes,
+        'prompt': engine.pending_prompt,
+        'duration': engine.current_phase_duration,
+        'elapsed': round(engine.phase_elapsed, 3),
+        'remaining': round(remaining, 3),
+        'total_work': round(engine.total_work_elapsed, 3),
+        'ends_at': round(time.time() + remaining, 3) if engine.running else None,
+    }
+
+
+def _index(args, count, what):
+    if len(args) != 1 or not args[0].isdigit() or not 1 <= int(args[0]) <= count:
+        raise CommandError(f"{what} must be a number from 1 to {count}")
+    return int(args[0]) - 1
+
+
+def _minutes(args, what):
+    try:
+        minutes = float(args[0]) if len(args) == 1 else -1.0
+    except ValueError:
+        minutes = -1.0
+    if not 0 <= minutes < float('inf'):
+        raise CommandError(f"{what} must be a number of minutes")
+    return minutes * 60
+
+
+def _answer(engine, prompt, args):
+    answer = args[0] if args else "yes"
+    if answer not in ("yes", "no"):
+        raise CommandError("answer must be yes or no")
+    expected = "focus_check" if prompt == "focus" else "snooze_prompt"
+    if engine.pending_prompt != expected:
+        raise CommandError(f"no {prompt} prompt is pending")
+    engine.handle_action(f"{prompt}_{answer}")
+
+
+def _start(engine, args):
+    if engine.paused:
+        engine.toggle_pause()
+    elif engine.pending_prompt:
+        raise CommandError(f"answer the pending {engine.pending_prompt} first")
+    elif engine.state == DONE:
+        raise CommandError("all sessions are complete")
+    elif not engine.running:
+        engine.toggle()
+
+
+def _pause(engine, args):
+    if not engine.paused:
+        engine.toggle_pause()
+
+
+def _resume(engine, args):
+    if engine.paused:
+        engine.toggle_pause()
+
+
+def _skip(engine, args):
+    if not engine.running:
+        raise CommandError("nothing is running")
+    engine.skip()
+
+
+def _fast_forward(engine, args):
+    seconds = _minutes(args, "fast-forward")
+    if engine.state == DONE:
+        raise CommandError("all sessions are complete")
+    engine.fast_forward(seconds)
+
+
+def _stop(engine, args):
+    if engine.state == DONE:
+        raise CommandError("all sessions are complete")
+    engine.stop_session()
+
+
+COMMANDS = {
+    'start': _start,
+    'pause': _pause,
+    'resume': _resume,
+    'toggle': lambda engine, args: engine.toggle(),
+    'skip': _skip,
+    'stop': _stop,
+    'select-session': lambda engine, args: engine.select_session(
+        _index(args, engine.daily_sessions, "session")),
+    'select-phase': lambda engine, args: engine.select_phase(
+        _index(args, engine.total_phases, "phase")),
+    # Minutes into the nominal day, as laid out by the config without snoozes
+    'seek': lambda engine, args: engine.seek(_minutes(args, "seek")),
+    'fast-forward': _fast_forward,
+    'focus': lambda engine, args: _answer(engine, "focus", args),
+    'snooze': lambda engine, args: _answer(engine, "snooze", args),
+    'status': lambda engine, args: None,
+}
+
+
+def execute(engine, line):
+    """Run one command line against `engine` and return the JSON reply"""
+    words = line.split()
+    if not words:
+        return {'ok': False, 'error': f"expected one of: {USAGE}"}
+    command = COMMANDS.get(words[0])
+    if command is None:
+        return {'ok': False, 'error': f"unknown command '{words[0]}', expected one of: {USAGE}"}
+    try:
+        command(engine, words[1:])
+    except CommandError as e:
+        return {'ok': False, 'error': str(e)}
+    return {'ok': True, 'status': status(engine)}
+
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def send(socket_path, line, timeout=2.0):
+    """Send one command to a running timer and return its decoded reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(line.encode() + b'\n')
+        return json.loads(sock.makefile('rb').readline())
+
+
+def subscribe(socket_path):
+    """Yield the decoded event messages pushed by a running timer"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(b'subscribe\n')
+        for line in sock.makefile('rb'):
+            yield json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Control a running Pomodoro timer')
+    parser.add_argument('--socket', default=default_socket_path(),
+                        help='Control socket of the timer (default: %(default)s)')
+    parser.add_argument('command', nargs='+', help=USAGE)
+    args = parser.parse_args()
+    line = ' '.join(args.command)
+    try:
+        if args.command[0] == 'subscribe':
+            for message in subscribe(args.socket):
+                print(json.dumps(message), flush=True)
+        else:
+            reply = send(args.socket, line)
+            if 'metrics' in reply or 'trace' in reply:
+                print(reply.get('metrics') or reply.get('trace'), end='')
+            else:
+                print(json.dumps(reply))
+            sys.exit(0 if reply.get('ok') else 1)
+    except (ConnectionRefusedError, FileNotFoundError):
+        print(f"Error: no timer is listening on '{args.socket}'")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
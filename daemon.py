@@ -0,0 +1,343 @@
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import sys
+import time
+from audio import AudioEngine
+from checkpoint import CheckpointWriter, default_checkpoint_path, load_checkpoint, snapshot
+from config import ConfigError, ConfigWatch, load_config, read_config
+from export import add_export_arguments, make_exporter
+from gaps import BootAlarm, GapDetector
+from instance import CLIENT_TIMEOUT, InstanceLock
+from control import default_socket_path, encode, execute, status
+from metrics import WRITE_INTERVAL, Metrics, add_metrics_argument, monitor_loop_lag, timed
+from journal import JournalWriter, default_history_path
+from notifications import NotificationQueue, make_backend
+from timer_engine import TimerEngine
+from tracer import add_trace_arguments, trace_event, tracer
+
+# Subscribers further behind than this are disconnected rather than
+# buffered without bound
+MAX_SUBSCRIBER_BACKLOG = 64 * 1024
+
+
+class TimerDaemon:
+    """Runs the timer without Qt and serves it on a Unix socket.
+
+    The engine is only woken at phase, snooze and break boundaries, never
+    once per second. Commands and subscriptions use the line protocol from
+    control.py; each transition is encoded once and written to every
+    subscriber's buffer, so subscribers cost nothing between transitions.
+    Like the window, it holds the InstanceLock, since both write the same
+    history and checkpoint, and answers commands forwarded by main.py.
+    """
+
+    def __init__(self, config_path, socket_path, notifier='auto', history=None,
+                 checkpoint=None, exporter=None, silent=False, metrics_path=None,
+                 instance=None):
+        self.config_path = config_path
+        self.socket_path = socket_path
+        self.instance = instance
+        self._instance_clients = {}
+        self.exporter = exporter
+        self.metrics_path = metrics_path
+        self.metrics = Metrics() if metrics_path else None
+        if self.metrics is not None:
+            self.tick_lag = self.metrics.histogram(
+                'tick_lag_seconds', "How late boundary wakeups fire compared to when they were due")
+            self.handle_histogram = self.metrics.histogram(
+                'handle_action_seconds', "Time spent in TimerEngine.handle_action")
+        self.loop = asyncio.get_running_loop()
+        self.audio = AudioEngine(silent=silent)
+        self.engine = TimerEngine(load_config(config_path), notify=self.notify,
+                                  play_sound=self.audio.play)
+        self.engine.listeners.append(self.on_engine_event)
+        self.engine.listeners.append(trace_event)
+        self.journal = JournalWriter(history) if history else None
+        if self.journal is not None:
+            self.engine.listeners.append(self.journal.record)
+        self.checkpoint = CheckpointWriter(checkpoint) if checkpoint else None
+        if self.checkpoint is not None:
+            self.engine.listeners.append(
+                lambda event, engine: self.checkpoint.save(snapshot(engine)))
+        self.backend = make_backend(notifier, self.on_action)
+        print(f"Using {self.backend.name} notifications")
+        self.notification_queue = NotificationQueue(self.backend.show)
+        self.subscribers = set()
+        self.server = None
+        self.config_watch = None
+        self._wakeup = None
+        self._due = None
+        self.gaps = GapDetector(self.metrics)
+        self.engine.listeners.append(self.gaps.on_engine_event)
+        try:
+            self.alarm = BootAlarm()
+        except (OSError, AttributeError) as e:
+            print(f"Warning: wakeups after a suspend may be late: {e}")
+            self.alarm = None
+        else:
+            self.loop.add_reader(self.alarm.fd, self._alarm_fired)
+        self._metrics_handle = None
+        self._tasks = []
+
+    async def start(self):
+        self._tasks.append(self.loop.create_task(self.notification_queue.run()))
+        if self.metrics is not None:
+            lag = self.metrics.histogram('asyncio_loop_lag_seconds', "Lateness of the daemon's asyncio loop")
+            self._tasks.append(self.loop.create_task(monitor_loop_lag(lag)))
+            self._write_metrics()
+        claim_socket(self.socket_path)
+        self.server = await asyncio.start_unix_server(self.handle_client, self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        if self.instance is not None:
+            self.loop.add_reader(self.instance.fileno(), self._accept_instance_clients)
+        try:
+            self.config_watch = ConfigWatch(self.config_path)
+        except (OSError, AttributeError) as e:
+            print(f"Warning: config hot-reload unavailable: {e}")
+        else:
+            self.loop.add_reader(self.config_watch.fd, self._config_changed)
+        print(f"Listening on {self.socket_path}")
+
+    def resume_from(self, path):
+        saved = load_checkpoint(path)
+        if saved is None:
+            print("No checkpoint to resume from, starting a new day")
+            return
+        try:
+            self.engine.restore(saved)
+        except ValueError as e:
+            print(f"Warning: cannot resume: {e}")
+
+    def _accept_instance_clients(self):
+        for client in self.instance.accept():
+            self.loop.add_reader(client.fileno(), self._serve_instance_client, client)
+            self._instance_clients[client] = self.loop.call_later(
+                CLIENT_TIMEOUT, self._drop_instance_client, client)
+
+    def _serve_instance_client(self, client):
+        if not client.serve(self.run_command):
+            self._drop_instance_client(client)
+
+    def _drop_instance_client(self, client):
+        deadline = self._instance_clients.pop(client, None)
+        if deadline is not None:
+            deadline.cancel()
+            self.loop.remove_reader(client.fileno())
+            client.close()
+
+    def run_command(self, line):
+        """Reply to one command forwarded by a main.py launch"""
+        if line.split()[:1] in (["show"], ["config"]):
+            return {'ok': False, 'error': "the timer is running without a window in daemon.py"}
+        return execute(self.engine, line)
+
+    def notify(self, title, message, actions=None, timeout=None):
+        self.notification_queue.put(title, message, actions, timeout)
+
+    def on_action(self, action_id):
+        # Backends may answer from any thread
+        if self.metrics is None:
+            self.loop.call_soon_threadsafe(self.engine.handle_action, action_id)
+        else:
+            self.loop.call_soon_threadsafe(timed, self.handle_histogram, self.engine.handle_action, action_id)
+
+    def on_engine_event(self, event, engine):
+        self.reschedule()
+        if self.exporter is not None:
+            self.exporter.update(engine)
+        if self.subscribers:
+            self.broadcast(encode({'event': event, 'status': status(engine)}))
+
+    def broadcast(self, data):
+        for writer in list(self.subscribers):
+            if writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BACKLOG:
+                tracer.warning("socket", "dropping a subscriber that stopped reading")
+                self.subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(data)
+
+    def reschedule(self):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        # Boundaries only, unless a status export needs the countdown
+        delay = self.engine.next_wakeup(self.exporter.resolution if self.exporter else None)
+        if delay is not None:
+            self._due = self.loop.time() + delay
+            self._wakeup = self.loop.call_at(self._due, self._tick)
+        if self.alarm is not None:
+            # call_at sleeps on the monotonic clock, which stops during a suspend
+            self.alarm.arm(delay)
+
+    def _alarm_fired(self):
+        if self.alarm.fired() and self._wakeup is not None:
+            self._wakeup.cancel()
+            self._tick()
+
+    def _tick(self):
+        self._wakeup = None
+        if self.metrics is not None:
+            self.tick_lag.observe(max(self.loop.time() - self._due, 0.0))
+        # loop.time() is the monotonic clock
+        self.gaps.tick(self.engine, self._due)
+        if self._wakeup is None:
+            # No transition (a countdown step, or the clock was slightly early)
+            if self.exporter is not None:
+                self.exporter.update(self.engine)
+            self.reschedule()
+
+    def _write_metrics(self):
+        self.metrics.write(self.metrics_path)
+        self._metrics_handle = self.loop.call_later(WRITE_INTERVAL, self._write_metrics)
+
+    def _config_changed(self):
+        if not self.config_watch.changed():
+            return
+        start = time.perf_counter()
+        try:
+            config = read_config(self.config_path)
+        except ConfigError as e:
+            print(f"Config reload rejected, keeping the current schedule: {e}")
+            return
+        self.engine.apply_config(config)
+        print(f"Config reloaded in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode(errors='replace').strip()
+                if line == 'subscribe':
+                    self.subscribers.add(writer)
+                    writer.write(encode({'ok': True, 'status': status(self.engine)}))
+                elif line == 'trace':
+                    writer.write(encode({'ok': True, 'trace': "".join(l + "\n" for l in tracer.lines())}))
+                elif line == 'metrics':
+                    if self.metrics is None:
+                        writer.write(encode({'ok': False, 'error': "metrics are off (start with --metrics)"}))
+                    else:
+                        writer.write(encode({'ok': True, 'metrics': self.metrics.render()}))
+                else:
+                    writer.write(encode(execute(self.engine, line)))
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            writer.close()
+
+    def close(self):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        for task in self._tasks:
+            task.cancel()
+        if self._metrics_handle is not None:
+            self._metrics_handle.cancel()
+        if self.server is not None:
+            self.server.close()
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        for writer in self.subscribers:
+            writer.close()
+        if self.instance is not None:
+            self.loop.remove_reader(self.instance.fileno())
+            for client in list(self._instance_clients):
+                self._drop_instance_client(client)
+            self.instance.close()
+        if self.alarm is not None:
+            self.loop.remove_reader(self.alarm.fd)
+            self.alarm.close()
+        if self.config_watch is not None:
+            self.loop.remove_reader(self.config_watch.fd)
+            self.config_watch.close()
+        if self.journal is not None:
+            self.journal.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+        print(f"Notification queue: {self.notification_queue.summary()}")
+        print(f"Clock gaps: {self.gaps.summary()}")
+        if self.exporter is not None:
+            print(f"Status export: {self.exporter.summary()}")
+        if self.metrics is not None:
+            self.metrics.write(self.metrics_path)
+        print(f"Audio: {self.audio.summary()}")
+        self.audio.close()
+        tracer.close()
+
+
+def claim_socket(path):
+    """Remove a stale socket file, refusing to run next to a live timer"""
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    print(f"Error: a timer is already listening on '{path}'")
+    sys.exit(1)
+
+
+async def serve(args):
+    tracer.configure(args.trace_level, args.trace_file)
+    instance = InstanceLock.acquire()
+    if instance is None:
+        print("Error: a timer is already running; main.py and daemon.py share the history and checkpoint")
+        sys.exit(1)
+    daemon = TimerDaemon(args.config, args.socket, notifier=args.notifier,
+                         history=args.history, checkpoint=args.checkpoint,
+                         exporter=make_exporter(args), silent=args.silent,
+                         metrics_path=args.metrics, instance=instance)
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        daemon.loop.add_signal_handler(signum, stop.set)
+    daemon.loop.add_signal_handler(signal.SIGUSR1, tracer.request_dump)
+    try:
+        await daemon.start()
+        if args.resume and args.checkpoint:
+            daemon.resume_from(args.checkpoint)
+        if args.start:
+            daemon.engine.toggle()
+        await stop.wait()
+    finally:
+        daemon.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run the Pomodoro timer without a window')
+    parser.add_argument('--config', '-c', default='pomodoro_config.json',
+                        help='Path to the configuration file (default: pomodoro_config.json)')
+    parser.add_argument('--socket', default=default_socket_path(),
+                        help='Control socket to serve (default: %(default)s)')
+    parser.add_argument('--notifier', default='auto',
+                        choices=['auto', 'dbus', 'notify-send', 'memory'],
+                        help='Notification backend (default: auto, the fastest one available)')
+    parser.add_argument('--history', default=default_history_path(),
+                        help='Session history journal (default: %(default)s)')
+    parser.add_argument('--no-history', dest='history', action='store_const', const=None,
+                        help='Do not record session history')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue from the last checkpoint instead of starting a new day')
+    parser.add_argument('--checkpoint', default=default_checkpoint_path(),
+                        help='Checkpoint file written on every transition (default: %(default)s)')
+    parser.add_argument('--start', action='store_true',
+                        help='Start working right away instead of waiting for a start command')
+    parser.add_argument('--silent', action='store_true',
+                        help='Do not play sounds (cues are still timed and counted)')
+    add_export_arguments(parser)
+    add_metrics_argument(parser)
+    add_trace_arguments(parser)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve(parse_args()))
@@ -0,0 +1,123 @@
+import errno
+import json
+import math
+import os
+import stat
+from control import status
+from paths import runtime_dir
+from timer_engine import BREAK, DONE, EXTENDED, IDLE, PROMPT, AWAIT_BREAK, AWAIT_SESSION
+
+STATE_LABELS = {
+    IDLE: "idle", EXTENDED: "snooze", BREAK: "break",
+    AWAIT_BREAK: "break?", AWAIT_SESSION: "next?", DONE: "done",
+}
+
+
+def default_status_path():
+    return os.path.join(runtime_dir(), 'status')
+
+
+def add_export_arguments(parser):
+    parser.add_argument('--status-file', metavar='PATH',
+                        help='Keep a one-line status in this file or FIFO')
+    parser.add_argument('--status-file-default', dest='status_file', action='store_const',
+                        const=default_status_path(), help='Same, in %(const)s')
+    parser.add_argument('--status-json', metavar='PATH',
+                        help='Keep the status as JSON in this file or FIFO')
+    parser.add_argument('--status-json-default', dest='status_json', action='store_const',
+                        const=default_status_path() + '.json', help='Same, in %(const)s')
+    parser.add_argument('--status-resolution', type=int, default=1,
+                        help='Seconds of remaining time between status updates (default: 1)')
+
+
+def make_exporter(args):
+    if not (args.status_file or args.status_json):
+        return None
+    return StatusExporter(args.status_file, args.status_json, max(args.status_resolution, 1))
+
+
+def status_line(engine, remaining):
+    """Compact one-line status for panel plugins, e.g. "work 12:34 S1/4 P2/3" """
+    if engine.state == DONE:
+        return "done"
+    if engine.paused:
+        label = "paused"
+    elif engine.state == PROMPT:
+        label = "focus?" if engine.pending_prompt == "focus_check" else "snooze?"
+    else:
+        label = STATE_LABELS.get(engine.state, "work")
+    m, s = divmod(remaining, 60)
+    return (f"{label} {m:02}:{s:02} S{engine.session + 1}/{engine.daily_sessions}"
+            f" P{engine.work_phase + 1}/{engine.total_phases}")
+
+
+class StatusExporter:
+    """Publishes the timer status to files that panel plugins can just read.
+
+    update() is cheap to call on every tick: it compares the displayed value
+    (remaining time at `resolution` seconds plus the position) with the last
+    one and only writes when it changed. Regular files are replaced
+    atomically by renaming a temporary file over them, so a reader never
+    sees a torn line; FIFOs get one short write (atomic below PIPE_BUF) and
+    are skipped while nobody is reading. Put the files on a tmpfs such as
+    $XDG_RUNTIME_DIR.
+    """
+
+    def __init__(self, path=None, json_path=None, resolution=1):
+        self.path = path
+        self.json_path = json_path
+        self.resolution = resolution
+        self.writes = 0
+        self.skipped = 0
+        self._key = None
+        for target in (path, json_path):
+            if target:
+                os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+
+    def update(self, engine):
+        remaining = math.ceil(engine.remaining / self.resolution) * self.resolution
+        key = (engine.state, engine.paused, remaining, engine.session,
+               engine.work_phase, engine.snooze_count)
+        if key == self._key:
+            self.skipped += 1
+            return
+        self._key = key
+        if self.path:
+            self._publish(self.path, status_line(engine, remaining) + "\n")
+        if self.json_path:
+            self._publish(self.json_path, json.dumps(status(engine), separators=(',', ':')) + "\n")
+
+    def _publish(self, path, text):
+        data = text.encode()
+        try:
+            if stat.S_ISFIFO(os.stat(path).st_mode):
+                self._write_fifo(path, data)
+                return
+        except FileNotFoundError:
+            pass
+        tmp = path + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+            self.writes += 1
+        except OSError as e:
+            print(f"Warning: could not export status to '{path}': {e}")
+
+    def _write_fifo(self, path, data):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno != errno.ENXIO:  # ENXIO: no reader right now
+                print(f"Warning: could not export status to '{path}': {e}")
+            return
+        try:
+            os.write(fd, data)
+            self.writes += 1
+        except (BlockingIOError, BrokenPipeError):
+            pass  # the reader is behind or just left; it will get the next change
+        finally:
+            os.close(fd)
+
+    def summary(self):
+        return f"{self.writes} writes, {self.skipped} unchanged updates skipped"
@@ -0,0 +1,138 @@
+import ctypes
+import ctypes.util
+import os
+import time
+from timer_engine import boot_clock
+from tracer import tracer
+
+CLOCK_BOOTTIME = 7
+TFD_NONBLOCK = os.O_NONBLOCK
+TFD_CLOEXEC = os.O_CLOEXEC
+
+
+class _Timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+
+class _Itimerspec(ctypes.Structure):
+    _fields_ = [('it_interval', _Timespec), ('it_value', _Timespec)]
+
+
+class BootAlarm:
+    """One-shot timerfd on the boot-time clock.
+
+    Timers on the monotonic clock (QTimer, asyncio) stop while the machine
+    is suspended, so a deadline that passes during a suspend fires only as
+    much later as the suspend lasted. This one becomes readable on resume.
+    Arm it next to the regular wakeup, hand `fd` to the event loop
+    (QSocketNotifier, loop.add_reader) and call fired() when it is readable.
+    """
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self._libc.timerfd_create(CLOCK_BOOTTIME, TFD_NONBLOCK | TFD_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "timerfd_create failed")
+
+    def arm(self, delay):
+        """Fire after `delay` seconds of boot time; None disarms"""
+        spec = _Itimerspec()
+        if delay is not None:
+            # An all-zero value would disarm instead
+            nanoseconds = max(int(delay * 1e9), 1)
+            spec.it_value.tv_sec, spec.it_value.tv_nsec = divmod(nanoseconds, 1000000000)
+        if self._libc.timerfd_settime(self.fd, 0, ctypes.byref(spec), None) < 0:
+            raise OSError(ctypes.get_errno(), "timerfd_settime failed")
+
+    def fired(self):
+        """Drain the expiry; False if it was re-armed since it became readable"""
+        try:
+            os.read(self.fd, 8)
+        except BlockingIOError:
+            return False
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class GapDetector:
+    """Notices time that went by without the timer seeing it.
+
+    A suspend shows up as the boot-time clock, which keeps counting while
+    the machine sleeps, running ahead of the monotonic one, which does not.
+    A stall (a blocked event loop, a slow slot) shows up as a wakeup firing
+    well after it was due. Gaps below THRESHOLD are ordinary wakeup jitter.
+    Every gap is traced and counted, and exported when metrics are on.
+    """
+
+    THRESHOLD = 1.0
+
+    def __init__(self, metrics=None, monotonic=time.monotonic, boottime=boot_clock):
+        self.monotonic = monotonic
+        self.boottime = boottime
+        self._mono = monotonic()
+        self._boot = boottime()
+        self.suspends = 0
+        self.suspended = 0.0
+        self.stalls = 0
+        self.stalled = 0.0
+        self._running = False
+        self.metrics = None
+        if metrics is not None:
+            self.metrics = (
+                metrics.counter('clock_suspends_total', "Suspends noticed between ticks"),
+                metrics.counter('clock_suspended_seconds_total', "Time spent suspended"),
+                metrics.counter('clock_stalls_total', f"Wakeups {self.THRESHOLD:g} s or more late"),
+                metrics.counter('clock_stalled_seconds_total', "Lateness of those wakeups"),
+            )
+
+    def reset(self):
+        """Start measuring afresh, forgetting any suspend since the last check"""
+        self._mono, self._boot = self.monotonic(), self.boottime()
+
+    def on_engine_event(self, event, engine):
+        """Engine listener: a suspend while the clock stood still is no gap"""
+        if engine.running and not self._running:
+            self.reset()
+        self._running = engine.running
+
+    def check(self, due=None):
+        """Seconds missed since the last check; `due` is the monotonic time
+        the current wakeup was armed for"""
+        mono, boot = self.monotonic(), self.boottime()
+        suspended = (boot - self._boot) - (mono - self._mono)
+        self._mono, self._boot = mono, boot
+        stalled = mono - due if due is not None else 0.0
+        gap = 0.0
+        if suspended >= self.THRESHOLD:
+            gap += suspended
+            self.suspends += 1
+            self.suspended += suspended
+            tracer.warning("clock", "suspended for %.1f s", suspended)
+            if self.metrics is not None:
+                self.metrics[0].inc()
+                self.metrics[1].inc(suspended)
+        if stalled >= self.THRESHOLD:
+            gap += stalled
+            self.stalls += 1
+            self.stalled += stalled
+            tracer.warning("clock", "wakeup %.1f s late", stalled)
+            if self.metrics is not None:
+                self.metrics[2].inc()
+                self.metrics[3].inc(stalled)
+        return gap
+
+    def tick(self, engine, due=None):
+        """Tick `engine`, reconciling whatever gap the last tick left behind"""
+        gap = self.check(due)
+        if gap and engine.running:
+            crossed = engine.reconcile(gap)
+            tracer.warning("clock", "caught up on %.1f s (%s): %d boundaries passed",
+                           gap, engine.catch_up, crossed)
+        else:
+            engine.tick()
+
+    def summary(self):
+        return (f"{self.suspends} suspends ({self.suspended:.0f} s), "
+                f"{self.stalls} stalls ({self.stalled:.1f} s)")
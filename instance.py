@@ -0,0 +1,154 @@
+import errno
+import json
+import os
+import socket
+import struct
+import sys
+from control import encode
+from paths import runtime_dir
+from tracer import tracer
+
+# Seconds a forwarding client may stay connected before it is dropped
+CLIENT_TIMEOUT = 0.5
+
+
+def default_instance_address():
+    if sys.platform.startswith('linux'):
+        # Abstract namespace: no file to clean up, gone when the process exits
+        return f"\0dynamictimer-{os.getuid()}"
+    return os.path.join(runtime_dir(), 'instance.sock')
+
+
+class InstanceLock:
+    """Listening socket that makes this process the one running timer.
+
+    A later launch fails to bind the same address and forwards its
+    commands instead. This module does not import Qt: the window polls
+    fileno() with a QSocketNotifier, calls accept() when it is readable and
+    polls each client it returns the same way, so a slow or silent client
+    never blocks the event loop.
+    """
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+
+    @classmethod
+    def acquire(cls, address=None):
+        """The lock, or None if another timer already holds it"""
+        address = address or default_instance_address()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            if not address.startswith('\0'):
+                os.makedirs(os.path.dirname(address), exist_ok=True)
+                if not _remove_stale(address):
+                    sock.close()
+                    return None
+            sock.bind(address)
+        except OSError as e:
+            sock.close()
+            if e.errno == errno.EADDRINUSE:
+                return None
+            raise
+        sock.listen(8)
+        sock.setblocking(False)
+        return cls(sock, address)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def accept(self):
+        """Every pending client, as non-blocking InstanceClients"""
+        clients = []
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return clients
+            if not _same_user(conn):
+                tracer.warning("instance", "refused a connection from another user")
+                conn.close()
+                continue
+            conn.setblocking(False)
+            clients.append(InstanceClient(conn))
+
+    def close(self):
+        self.sock.close()
+        if not self.address.startswith('\0'):
+            try:
+                os.unlink(self.address)
+            except FileNotFoundError:
+                pass
+
+
+class InstanceClient:
+    """A second launch connected to the lock, read without blocking"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._buffer = b''
+
+    def fileno(self):
+        return self.conn.fileno()
+
+    def serve(self, handle_line):
+        """Reply to every line received so far, one `handle_line(line)` reply
+        per line; False once the client is done and should be closed"""
+        try:
+            while True:
+                try:
+                    data = self.conn.recv(4096)
+                except (BlockingIOError, InterruptedError):
+                    return True
+                if not data:
+                    # The client shut down its side; a last line may lack its newline
+                    lines = [self._buffer] if self._buffer.strip() else []
+                    self._reply(lines, handle_line)
+                    return False
+                *lines, self._buffer = (self._buffer + data).split(b'\n')
+                self._reply(lines, handle_line)
+        except OSError as e:
+            # Including a reply that does not fit the socket buffer: the
+            # client is not reading them
+            tracer.warning("instance", "forwarding client failed: %s", e)
+            return False
+
+    def _reply(self, lines, handle_line):
+        for line in lines:
+            line = line.decode(errors='replace').strip()
+            tracer.info("instance", "forwarded %s", line)
+            self.conn.sendall(encode(handle_line(line)))
+
+    def close(self):
+        self.conn.close()
+
+
+def _remove_stale(path):
+    """Remove a socket file left by a crashed timer; False if one is live"""
+    if not os.path.exists(path):
+        return True
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return True
+    return False
+
+
+def _same_user(conn):
+    # Abstract sockets have no file permissions to keep other users out
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return True
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    return struct.unpack('3i', creds)[2] == os.getuid()
+
+
+def forward(lines, address=None, timeout=2.0):
+    """Send command lines to the running timer and return its decoded replies"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(address or default_instance_address())
+        sock.sendall(b''.join(line.encode() + b'\n' for line in lines))
+        sock.shutdown(socket.SHUT_WR)
+        return [json.loads(reply) for reply in sock.makefile('rb')]
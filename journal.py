@@ -0,0 +1,157 @@
+import datetime
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+# time, event, snooze_count, session, phase, phase_duration, phase_elapsed, total_work
+RECORD = struct.Struct('<dBBHHIfI6x')
+# day ordinal, index of the day's first record
+INDEX_ENTRY = struct.Struct('<IQ')
+
+EVENTS = (
+    "phase_started", "snooze_started", "break_started", "session_started",
+    "focus_check", "snooze_prompt", "break_pending", "break_over", "finished",
+    "stopped", "paused", "resumed", "session_selected", "phase_selected", "seeked",
+    "focus_yes", "focus_no", "snooze_yes", "snooze_no", "restored",
+)
+EVENT_CODES = {name: code for code, name in enumerate(EVENTS, start=1)}
+
+
+def default_history_path():
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(data_home, 'dynamictimer', 'history.bin')
+
+
+def index_path(path):
+    return path + '.idx'
+
+
+class JournalWriter:
+    """Append-only, fixed-width journal of timer transitions.
+
+    record() only packs 32 bytes and hands them to a background thread, so
+    the UI thread never waits on disk. The thread writes in batches and
+    appends to a per-day index whenever the local date changes.
+    """
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'ab')
+        self._index = open(index_path(path), 'ab')
+        self._count = self._file.tell() // RECORD.size
+        self._last_day = self._read_last_day()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    def _read_last_day(self):
+        size = os.path.getsize(index_path(self.path))
+        if size < INDEX_ENTRY.size:
+            return None
+        with open(index_path(self.path), 'rb') as f:
+            f.seek(size - size % INDEX_ENTRY.size - INDEX_ENTRY.size)
+            return INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))[0]
+
+    def record(self, event, engine):
+        """Engine listener: journal the transition `event`"""
+        code = EVENT_CODES.get(event)
+        if code is None:
+            return
+        self._queue.put(RECORD.pack(
+            self.clock(), code, min(engine.snooze_count, 255), engine.session,
+            engine.work_phase, engine.current_phase_duration, engine.phase_elapsed,
+            int(engine.total_work_elapsed)
+        ))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while True:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            closing = batch[-1] is None
+            if closing:
+                batch.pop()
+            for data in batch:
+                day = datetime.date.fromtimestamp(RECORD.unpack(data)[0]).toordinal()
+                if day != self._last_day:
+                    self._index.write(INDEX_ENTRY.pack(day, self._count))
+                    self._last_day = day
+                self._file.write(data)
+                self._count += 1
+            self._file.flush()
+            self._index.flush()
+            if closing:
+                return
+
+    def close(self):
+        """Flush everything recorded so far and stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        self._index.close()
+
+
+class JournalReader:
+    """Memory-mapped view of a journal; records are decoded only when touched"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._count = size // RECORD.size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < self._count:
+            raise IndexError(idx)
+        return RECORD.unpack_from(self._map, idx * RECORD.size)
+
+    def iter_records(self, start=0, stop=None):
+        stop = self._count if stop is None else min(stop, self._count)
+        for offset in range(start * RECORD.size, stop * RECORD.size, RECORD.size):
+            yield RECORD.unpack_from(self._map, offset)
+
+    def view(self, start, stop):
+        """memoryview of the raw records [start, stop) for batch decoding"""
+        return memoryview(self._map)[start * RECORD.size:min(stop, self._count) * RECORD.size]
+
+    def chunks(self, records_per_chunk=1 << 16):
+        """Yield (first record, memoryview) slices of raw records for batch decoding"""
+        for start in range(0, self._count, records_per_chunk):
+            yield start, self.view(start, start + records_per_chunk)
+
+    def days(self):
+        """Map date -> (first record, end record) from the per-day index"""
+        entries = []
+        try:
+            with open(index_path(self.path), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+        for offset in range(0, len(data) - len(data) % INDEX_ENTRY.size, INDEX_ENTRY.size):
+            entries.append(INDEX_ENTRY.unpack_from(data, offset))
+        days = {}
+        for i, (day, start) in enumerate(entries):
+            end = entries[i + 1][1] if i + 1 < len(entries) else self._count
+            days[datetime.date.fromordinal(day)] = (start, min(end, self._count))
+        return days
+
+    def iter_day(self, date):
+        start, stop = self.days().get(date, (0, 0))
+        return self.iter_records(start, stop)
+
+    def close(self):
+        if self._count:
+            self._map.close()
+        self._file.close()
@@ -0,0 +1,130 @@
+import os
+import time
+from array import array
+from bisect import bisect_left
+from paths import runtime_dir
+
+# Upper bounds in seconds; one extra bucket catches everything above
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+INTERVAL_BUCKETS = (0.1, 0.5, 0.9, 0.99, 1.0, 1.01, 1.05, 1.1, 1.5, 2.0,
+                    5.0, 10.0, 60.0, 300.0, 1800.0)
+# Written every this many seconds when exporting to a file
+WRITE_INTERVAL = 15
+
+
+def default_metrics_path():
+    return os.path.join(runtime_dir(), 'metrics.prom')
+
+
+def add_metrics_argument(parser):
+    parser.add_argument('--metrics', metavar='PATH',
+                        help='Collect timing metrics and keep them in Prometheus text format in this file')
+    parser.add_argument('--metrics-default', dest='metrics', action='store_const',
+                        const=default_metrics_path(), help='Same, in %(const)s')
+
+
+class Histogram:
+    """Fixed-memory histogram; observe() is one bisect and three additions"""
+
+    __slots__ = ('name', 'help', 'bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, name, help, bounds):
+        self.name = name
+        self.help = help
+        self.bounds = bounds
+        self.counts = array('Q', bytes(8 * (len(bounds) + 1)))
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, prefix):
+        name = f"{prefix}_{self.name}"
+        lines = [f"# HELP {name} {self.help}", f"# TYPE {name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum {self.sum:.6f}")
+        lines.append(f"{name}_count {self.count}")
+        return lines
+
+
+class Counter:
+    __slots__ = ('name', 'help', 'value')
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self, prefix):
+        name = f"{prefix}_{self.name}"
+        return [f"# HELP {name} {self.help}", f"# TYPE {name} counter", f"{name} {self.value}"]
+
+
+class Metrics:
+    """Registry of histograms and counters, rendered in Prometheus text format.
+
+    Instrumented code holds a reference to a Metrics instance or None and
+    checks for None before measuring, so with metrics off the hot paths pay
+    a single attribute test.
+    """
+
+    def __init__(self, prefix='dynamictimer'):
+        self.prefix = prefix
+        self.series = {}
+
+    def histogram(self, name, help, bounds=LATENCY_BUCKETS):
+        if name not in self.series:
+            self.series[name] = Histogram(name, help, bounds)
+        return self.series[name]
+
+    def counter(self, name, help):
+        if name not in self.series:
+            self.series[name] = Counter(name, help)
+        return self.series[name]
+
+    def render(self):
+        lines = []
+        for series in self.series.values():
+            lines.extend(series.render(self.prefix))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Replace `path` atomically, as the node_exporter textfile collector expects"""
+        tmp = path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(tmp, 'w') as f:
+                f.write(self.render())
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Warning: could not write metrics to '{path}': {e}")
+
+
+async def monitor_loop_lag(histogram, interval=0.25):
+    """Measure how late the running asyncio loop wakes up a sleeping task"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        histogram.observe(max(loop.time() - start - interval, 0.0))
+
+
+def timed(histogram, func, *args):
+    """Call func(*args) and record how long it took"""
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        histogram.observe(time.perf_counter() - start)
@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import os
+import shutil
+import time
+import traceback
+from collections import deque
+from tracer import tracer
+try:
+    import desktop_notify
+    from desktop_notify import aio
+except ImportError:  # optional: the notify-send and memory backends work without it
+    desktop_notify = None
+    aio = None
+
+APP_NAME = "Dynamic Pomodoro Timer"
+
+
+def default_action(actions):
+    """Answer given when an interactive notification closes unanswered:
+    focus checks auto-confirm, snooze prompts auto-deny"""
+    return "focus_yes" if actions[0][0] == "focus_yes" else "snooze_no"
+
+
+class NotificationRequest:
+    __slots__ = ('title', 'message', 'actions', 'timeout', 'key', 'enqueued_at')
+
+    def __init__(self, title, message, actions=None, timeout=None, key=None, enqueued_at=0.0):
+        self.title = title
+        self.message = message
+        self.actions = actions
+        self.timeout = timeout
+        # Requests with the same key supersede each other; interactive
+        # prompts and plain status updates never replace one another.
+        self.key = key or ("prompt" if actions else "status")
+        self.enqueued_at = enqueued_at
+
+    @property
+    def display_timeout(self):
+        """Milliseconds on screen; prompts stay longer by default"""
+        if self.timeout is not None:
+            return self.timeout
+        return 10000 if self.actions else 5000
+
+
+class NotificationQueue:
+    """Bounded, coalescing dispatch queue in front of a notification backend.
+
+    Only one notification is in flight at a time. While the backend is busy
+    (e.g. a slow DBus server), new requests replace pending ones with the
+    same key, so a burst of transitions shows only the latest state, and the
+    queue never grows beyond `maxsize`. Must only be used from its event loop.
+    """
+
+    def __init__(self, show, maxsize=8, show_timeout=5.0, clock=time.monotonic):
+        self.show = show
+        self.maxsize = maxsize
+        self.show_timeout = show_timeout
+        self.clock = clock
+        self.pending = deque()
+        self.latencies = deque(maxlen=100)
+        self.shown = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.failed = 0
+        self._wakeup = asyncio.Event()
+
+    def put(self, title, message, actions=None, timeout=None, key=None):
+        request = NotificationRequest(title, message, actions, timeout, key, self.clock())
+        kept = deque(r for r in self.pending if r.key != request.key)
+        self.coalesced += len(self.pending) - len(kept)
+        self.pending = kept
+        while len(self.pending) >= self.maxsize:
+            self._drop_one()
+        self.pending.append(request)
+        self._wakeup.set()
+
+    def _drop_one(self):
+        # Shed the oldest status update first; prompts carry user decisions
+        for request in self.pending:
+            if not request.actions:
+                self.pending.remove(request)
+                break
+        else:
+            self.pending.popleft()
+        self.dropped += 1
+
+    async def run(self):
+        """Consume requests forever, one backend call at a time"""
+        while True:
+            if not self.pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            request = self.pending.popleft()
+            try:
+                await asyncio.wait_for(self.show(request), self.show_timeout)
+            except Exception as e:
+                self.failed += 1
+                tracer.error("notify", "show failed: %r\n%s", e, traceback.format_exc())
+                continue
+            self.shown += 1
+            self.latencies.append(self.clock() - request.enqueued_at)
+
+    def summary(self):
+        text = (f"{self.shown} shown, {self.coalesced} coalesced, "
+                f"{self.dropped} dropped, {self.failed} failed")
+        if self.latencies:
+            mean = sum(self.latencies) / len(self.latencies)
+            text += (f", latency mean {mean * 1000:.1f} ms"
+                     f" max {max(self.latencies) * 1000:.1f} ms")
+        return text
+
+
+class NotificationBackend:
+    """Shows NotificationRequests somewhere the user can see them.
+
+    Interactive requests must eventually report exactly one answer through
+    `on_action(action_id)`, falling back to default_action() when the user
+    does not respond. `on_action` may be called from any thread.
+    """
+
+    name = None
+
+    def __init__(self, on_action):
+        self.on_action = on_action
+
+    async def show(self, request):
+        raise NotImplementedError
+
+
+class DBusBackend(NotificationBackend):
+    """desktop-notify over one persistent session bus connection"""
+
+    name = "dbus"
+
+    def __init__(self, on_action, app_name=APP_NAME):
+        super().__init__(on_action)
+        self.server = aio.Server(app_name)
+        self._status_id = 0
+
+    async def show(self, request):
+        tracer.debug("dbus", "show %r: %r", request.title, request.message)
+        notify = self.server.Notify(request.title, request.message)
+        notify.set_timeout(request.display_timeout)
+        if not request.actions:
+            # Status updates replace the previous one in place, so a stale
+            # "Work Started" never lingers after the next transition
+            notify.set_id(self._status_id)
+            self._status_id = await self.server.show(notify)
+            notify.shown()
+            return
+        tracer.debug("dbus", "actions %r", request.actions)
+        # Per-notification flag, so a late close never answers twice
+        answered = []
+
+        def create_action_callback(action_id):
+            def callback(notification):
+                tracer.info("dbus", "answered %s", action_id)
+                # Mark as answered first to prevent on_close from triggering
+                answered.append(action_id)
+                self.on_action(action_id)
+            return callback
+
+        for action_id, action_label in request.actions:
+            notify.add_action(desktop_notify.Action(action_label, create_action_callback(action_id)))
+
+        # Set up close handler for auto-confirm/auto-deny
+        def on_close(notification, reason):
+            tracer.debug("dbus", "closed, reason %s", reason)
+            if not answered:
+                answer = default_action(request.actions)
+                tracer.info("dbus", "no answer, defaulting to %s", answer)
+                self.on_action(answer)
+
+        notify.set_on_close(on_close)
+        await notify.show()
+
+
+class NotifySendBackend(NotificationBackend):
+    """libnotify's notify-send, for desktops where the Python DBus stack is missing or slow.
+
+    Prompts use `--action` (libnotify 0.7.10+), which blocks until answered;
+    the answer is collected in the background so the queue is never held up.
+    If notify-send rejects it, prompts are shown without buttons from then
+    on and take their default answer when they expire.
+    """
+
+    name = "notify-send"
+
+    def __init__(self, on_action, app_name=APP_NAME):
+        super().__init__(on_action)
+        self.app_name = app_name
+        self.actions_supported = True
+        self._answers = set()
+
+    async def show(self, request):
+        actions = request.actions if self.actions_supported else None
+        args = ["notify-send", "--app-name", self.app_name,
+                "--expire-time", str(request.display_timeout)]
+        if actions:
+            args += [f"--action={action_id}={label}" for action_id, label in actions]
+        args += [request.title, request.message]
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdout=asyncio.subprocess.PIPE if actions else asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        if not actions:
+            if await proc.wait():
+                tracer.warning("notify-send", "exited with status %d", proc.returncode)
+            if request.actions:
+                # Nothing to click: answer as if it closed unanswered
+                asyncio.get_running_loop().call_later(
+                    request.display_timeout / 1000, self.on_action, default_action(request.actions))
+            return
+        task = asyncio.ensure_future(self._collect_answer(proc, request))
+        self._answers.add(task)
+        task.add_done_callback(self._answers.discard)
+
+    async def _collect_answer(self, proc, request):
+        out, _ = await proc.communicate()
+        if proc.returncode:
+            tracer.warning("notify-send", "--action failed with status %d, "
+                           "showing prompts without buttons", proc.returncode)
+            self.actions_supported = False
+            await self.show(request)
+            return
+        answer = out.decode(errors="replace").strip()
+        if answer not in {action_id for action_id, _ in request.actions}:
+            answer = default_action(request.actions)
+        self.on_action(answer)
+
+
+class MemoryBackend(NotificationBackend):
+    """Zero-cost recorder; prompts are answered with their default right away"""
+
+    name = "memory"
+
+    def __init__(self, on_action):
+        super().__init__(on_action)
+        self.shown = deque(maxlen=1000)
+
+    async def show(self, request):
+        self.shown.append(request)
+        if request.actions:
+            asyncio.get_running_loop().call_soon(self.on_action, default_action(request.actions))
+
+
+BACKENDS = {
+    backend.name: backend for backend in (DBusBackend, NotifySendBackend, MemoryBackend)
+}
+
+
+def available_backends():
+    """Names of the Qt-free backends usable on this machine, preferred first"""
+    names = []
+    if aio is not None and (os.environ.get("DBUS_SESSION_BUS_ADDRESS") or os.environ.get("DISPLAY")):
+        names.append(DBusBackend.name)
+    if shutil.which("notify-send"):
+        names.append(NotifySendBackend.name)
+    names.append(MemoryBackend.name)
+    return names
+
+
+def make_backend(name, on_action):
+    if name == "auto":
+        name = available_backends()[0]
+    return BACKENDS[name](on_action)
+
+
+async def _benchmark_backend(backend, count):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        request = NotificationRequest("Benchmark", f"Notification {i + 1}/{count}", timeout=1000)
+        t0 = time.perf_counter()
+        await backend.show(request)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return sum(latencies) / count, latencies[min(count - 1, int(count * 0.95))], count / elapsed
+
+
+def benchmark(names, count):
+    """Print show latency and throughput for each backend in `names`"""
+    for name in names:
+        try:
+            if name == "tray":
+                # The tray backend needs a Qt application and lives with the Qt widgets
+                from PyQt5.QtWidgets import QApplication
+                from widgets import create_tray_backend
+                # Parenting the icon to the application keeps both alive
+                app = QApplication.instance() or QApplication([])
+                backend = create_tray_backend(lambda action_id: None, app)
+            else:
+                backend = BACKENDS[name](lambda action_id: None)
+            mean, p95, rate = asyncio.run(_benchmark_backend(backend, count))
+        except Exception as e:
+            print(f"{name:12} unavailable: {e!r}")
+            continue
+        print(f"{name:12} mean {mean * 1000:8.3f} ms  p95 {p95 * 1000:8.3f} ms  {rate:10.1f}/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare notification backends')
+    parser.add_argument('--backends', default=",".join(available_backends()),
+                        help='Comma-separated backends to compare: dbus, notify-send, tray, memory '
+                             '(default: all available without Qt)')
+    parser.add_argument('--count', '-n', type=int, default=20,
+                        help='Notifications shown per backend (default: 20)')
+    args = parser.parse_args()
+    benchmark(args.backends.split(","), args.count)
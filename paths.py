@@ -0,0 +1,24 @@
+import os
+import stat
+
+
+def runtime_dir():
+    """Per-user directory for sockets, status files, metrics and trace dumps.
+
+    $XDG_RUNTIME_DIR/dynamictimer, or /tmp/dynamictimer-UID without a
+    runtime directory. It is created private to the user. Since anyone can
+    create a name in /tmp first, an existing one that is not a directory
+    owned by the user is refused rather than written into.
+    """
+    base = os.environ.get('XDG_RUNTIME_DIR')
+    path = os.path.join(base, 'dynamictimer') if base else f"/tmp/dynamictimer-{os.getuid()}"
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"refusing to use '{path}': not a directory owned by uid {os.getuid()}")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+    return path
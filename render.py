@@ -0,0 +1,59 @@
+from functools import lru_cache
+from PyQt5.QtCore import QObject, QTimer
+
+
+@lru_cache(maxsize=8192)
+def format_time(seconds):
+    m, s = divmod(int(seconds), 60)
+    return f"{m:02}:{s:02}"
+
+
+class LabelRenderer(QObject):
+    """Diff-based, coalesced text updates for a set of labels.
+
+    set_text() only stages a change; everything staged during one pass of
+    the event loop is applied together on the next one, and labels whose
+    text would not change are never touched (no setText, no relayout).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.applied = 0
+        self.skipped = 0
+        self._shown = {}
+        self._staged = {}
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def set_text(self, label, text):
+        if self._staged.get(label, self._shown.get(label)) == text:
+            self.skipped += 1
+            return
+        self._staged[label] = text
+        if not self._flush_timer.isActive():
+            self._flush_timer.start(0)
+
+    def forget(self):
+        """Drop all labels, e.g. because the widgets are about to be deleted"""
+        self._flush_timer.stop()
+        self._staged.clear()
+        self._shown.clear()
+
+    def skip(self, count=1):
+        """Account for updates the caller avoided without staging anything"""
+        self.skipped += count
+
+    def flush(self):
+        staged, self._staged = self._staged, {}
+        for label, text in staged.items():
+            if self._shown.get(label) == text:
+                # Changed and changed back within the same frame
+                self.skipped += 1
+                continue
+            label.setText(text)
+            self._shown[label] = text
+            self.applied += 1
+
+    def summary(self):
+        return f"{self.applied} label updates applied, {self.skipped} skipped"
@@ -0,0 +1,104 @@
+import math
+import time
+from PyQt5.QtCore import QObject, QSocketNotifier, QTimer, Qt
+from gaps import BootAlarm
+
+
+class WakeupScheduler(QObject):
+    """Arms a single-shot timer for the next moment that actually matters.
+
+    Instead of waking at a fixed 1 Hz, the owner asks the engine how long it
+    may sleep (until the next label change while someone is watching, or the
+    next phase/break/snooze boundary otherwise) and arms exactly one timer.
+    A BootAlarm armed for the same moment wakes it on resume if that moment
+    passed while the machine was suspended.
+    """
+
+    # Fire slightly after the boundary so the clock reading is past it
+    SLACK = 0.005
+
+    def __init__(self, callback, parent=None, lag_histogram=None):
+        super().__init__(parent)
+        self.callback = callback
+        self.lag_histogram = lag_histogram
+        self.wakeups = 0
+        # Monotonic time the armed wakeup is due, or None
+        self.due = None
+        self.started = time.monotonic()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._fire)
+        try:
+            self.alarm = BootAlarm()
+        except (OSError, AttributeError) as e:
+            print(f"Warning: wakeups after a suspend may be late: {e}")
+            self.alarm = None
+        else:
+            self._alarm_notifier = QSocketNotifier(self.alarm.fd, QSocketNotifier.Read, self)
+            self._alarm_notifier.activated.connect(self._alarm_fired)
+
+    def arm(self, delay):
+        """Wake up after `delay` seconds; None cancels the pending wakeup"""
+        if delay is None:
+            self.stop()
+            return
+        self.due = time.monotonic() + delay + self.SLACK
+        self._timer.start(math.ceil((delay + self.SLACK) * 1000))
+        if self.alarm is not None:
+            self.alarm.arm(delay + self.SLACK)
+
+    def stop(self):
+        self.due = None
+        self._timer.stop()
+        if self.alarm is not None:
+            self.alarm.arm(None)
+
+    def _alarm_fired(self):
+        if self.alarm.fired() and self._timer.isActive():
+            self._timer.stop()
+            self._fire()
+
+    def _fire(self):
+        self.wakeups += 1
+        if self.lag_histogram is not None:
+            # How late the wakeup came compared to when it was due
+            self.lag_histogram.observe(max(time.monotonic() - self.due, 0.0))
+        self.callback()
+
+    def wakeups_per_hour(self):
+        hours = (time.monotonic() - self.started) / 3600
+        return self.wakeups / hours if hours > 0 else 0.0
+
+    def summary(self):
+        return f"{self.wakeups} wakeups ({self.wakeups_per_hour():.1f}/h)"
+
+
+class StallDetector(QObject):
+    """Notices when the Qt event loop is blocked.
+
+    A coarse repeating timer records how late each expiry is; a late one
+    means the loop was busy (a slow slot, a blocking call) for that long.
+    Only created when metrics are on.
+    """
+
+    INTERVAL = 0.2
+    # Lateness that counts as a stall
+    THRESHOLD = 0.25
+
+    def __init__(self, lag_histogram, stall_counter, parent=None):
+        super().__init__(parent)
+        self.lag_histogram = lag_histogram
+        self.stall_counter = stall_counter
+        self._last = time.monotonic()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._check)
+        self._timer.start(int(self.INTERVAL * 1000))
+
+    def _check(self):
+        now = time.monotonic()
+        lag = max(now - self._last - self.INTERVAL, 0.0)
+        self._last = now
+        self.lag_histogram.observe(lag)
+        if lag >= self.THRESHOLD:
+            self.stall_counter.inc()
@@ -0,0 +1,298 @@
+import argparse
+import asyncio
+import functools
+import heapq
+import os
+import random
+import signal
+import time
+from config import ConfigError, load_config, read_config
+from control import USAGE, default_socket_path, encode, execute, status
+from daemon import MAX_SUBSCRIBER_BACKLOG, claim_socket
+from notifications import default_action
+from timer_engine import TimerEngine
+
+TICK = 0
+ANSWER = 1
+
+
+class HostedTimer:
+    __slots__ = ('name', 'engine', 'generation', 'prompt_serial', 'default_answer')
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        # Bumped whenever the timer is rescheduled or prompted, which
+        # invalidates older heap entries without searching for them
+        self.generation = 0
+        self.prompt_serial = 0
+        self.default_answer = None
+
+
+class TimerServer:
+    """Many independent timers driven by one priority queue of boundaries.
+
+    Each running timer has exactly one live heap entry, keyed on the moment
+    its phase, snooze or break ends; unanswered prompts get one more entry
+    for their timeout, after which the default answer applies as with a
+    desktop notification. Work per wakeup is O(log N) per due event, so the
+    cost follows the number of transitions instead of N timers x 1 Hz.
+    Superseded entries are skipped lazily when popped.
+    """
+
+    # Fire slightly after the boundary so the clock reading is past it
+    SLACK = 0.001
+
+    def __init__(self, clock=time.monotonic, loop=None, on_event=None, on_notify=None):
+        self.clock = clock
+        self.loop = loop
+        self.on_event = on_event
+        self.on_notify = on_notify
+        self.timers = {}
+        self.heap = []
+        self.events = 0
+        self.skipped = 0
+        self._seq = 0
+        self._handle = None
+        self._armed_at = None
+        self._draining = False
+
+    def add(self, name, config, start=False):
+        if name in self.timers:
+            raise ValueError(f"timer '{name}' already exists")
+        timer = HostedTimer(name, None)
+        timer.engine = TimerEngine(config, clock=self.clock,
+                                   notify=functools.partial(self._notify, timer))
+        if self.on_event is not None:
+            timer.engine.listeners.append(functools.partial(self.on_event, name))
+        self.timers[name] = timer
+        if start:
+            timer.engine.toggle()
+        self.schedule(timer)
+        return timer.engine
+
+    def remove(self, name):
+        timer = self.timers.pop(name)
+        # Any entries left in the heap no longer match the bumped counters
+        timer.generation += 1
+        timer.prompt_serial += 1
+
+    def command(self, name, line):
+        """Run a control.py command against one timer and reschedule it"""
+        timer = self.timers.get(name)
+        if timer is None:
+            return {'ok': False, 'error': f"no timer named '{name}'"}
+        reply = execute(timer.engine, line)
+        self.schedule(timer)
+        return reply
+
+    def schedule(self, timer):
+        timer.generation += 1
+        delay = timer.engine.next_wakeup()
+        if delay is not None:
+            self._push(self.clock() + delay + self.SLACK, TICK, timer, timer.generation)
+
+    def _notify(self, timer, title, message, actions=None, timeout=None):
+        if self.on_notify is not None:
+            self.on_notify(timer.name, title, message, actions)
+        if actions:
+            timer.prompt_serial += 1
+            timer.default_answer = default_action(actions)
+            seconds = (timeout if timeout is not None else 10000) / 1000
+            self._push(self.clock() + seconds, ANSWER, timer, timer.prompt_serial)
+
+    def _push(self, deadline, kind, timer, serial):
+        self._seq += 1
+        heapq.heappush(self.heap, (deadline, self._seq, kind, timer, serial))
+        if len(self.heap) > 2 * len(self.timers) + 1024:
+            self.compact()
+        if self.loop is not None and not self._draining:
+            self._arm()
+
+    def _is_live(self, kind, timer, serial):
+        if kind == TICK:
+            return serial == timer.generation
+        return serial == timer.prompt_serial and timer.engine.pending_prompt is not None
+
+    def run_due(self, now=None):
+        """Process every entry due at `now`; returns the number of transitions handled"""
+        now = self.clock() if now is None else now
+        heap = self.heap
+        handled = 0
+        self._draining = True
+        try:
+            while heap and heap[0][0] <= now:
+                _, _, kind, timer, serial = heapq.heappop(heap)
+                if not self._is_live(kind, timer, serial):
+                    self.skipped += 1
+                    continue
+                if kind == TICK:
+                    timer.engine.tick()
+                else:
+                    timer.engine.handle_action(timer.default_answer)
+                self.schedule(timer)
+                handled += 1
+        finally:
+            self._draining = False
+        self.events += handled
+        return handled
+
+    def compact(self):
+        """Drop superseded entries in one O(N) pass"""
+        self.heap = [entry for entry in self.heap if self._is_live(*entry[2:])]
+        heapq.heapify(self.heap)
+
+    def next_deadline(self):
+        return self.heap[0][0] if self.heap else None
+
+    # -- asyncio ------------------------------------------------------------
+
+    def _arm(self):
+        deadline = self.next_deadline()
+        if deadline is None or (self._armed_at is not None and self._armed_at <= deadline):
+            return
+        if self._handle is not None:
+            self._handle.cancel()
+        self._armed_at = deadline
+        self._handle = self.loop.call_at(deadline, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        self._armed_at = None
+        self.run_due()
+        self._arm()
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.cancel()
+
+
+def random_config(rng):
+    """A plausible, varied schedule for load tests"""
+    return {
+        'work_phases': [rng.choice((10, 15, 20, 25, 30, 45)) for _ in range(rng.randint(1, 4))],
+        'breaks': [rng.choice((5, 10, 15, 30)) for _ in range(rng.randint(1, 4))],
+        'snooze_interval': rng.choice((5, 10)),
+        'max_snoozes': rng.randint(0, 3),
+        'daily_sessions': rng.randint(2, 8),
+        'auto_start_breaks': True,
+        'auto_start_sessions': True,
+    }
+
+
+def benchmark(count, seed=0):
+    """Run `count` timers through a full day at virtual speed and report throughput"""
+    rng = random.Random(seed)
+    now = [0.0]
+    server = TimerServer(clock=lambda: now[0])
+    start = time.perf_counter()
+    for i in range(count):
+        server.add(f"t{i}", random_config(rng), start=True)
+        now[0] += rng.random()  # staggered starts
+    setup = time.perf_counter() - start
+    start = time.perf_counter()
+    while server.heap:
+        now[0] = server.next_deadline()
+        server.run_due()
+    elapsed = time.perf_counter() - start
+    ticks = count * now[0]
+    print(f"{count} timers: setup {setup * 1000:.0f} ms, "
+          f"{server.events} transitions in {elapsed:.2f} s ({server.events / elapsed:,.0f}/s), "
+          f"{server.skipped} superseded entries skipped")
+    print(f"Virtual span {now[0] / 3600:.1f} h: ticking every timer at 1 Hz would have taken "
+          f"{ticks:,.0f} wakeups, {ticks / max(server.events, 1):,.0f}x the heap's work")
+
+
+async def serve(args):
+    loop = asyncio.get_running_loop()
+    subscribers = {}
+
+    def on_event(name, event, engine):
+        if not subscribers:
+            return
+        data = None
+        for writer, wanted in list(subscribers.items()):
+            if wanted is None or wanted == name:
+                if writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BACKLOG:
+                    del subscribers[writer]
+                    writer.close()
+                    continue
+                if data is None:
+                    data = encode({'timer': name, 'event': event, 'status': status(engine)})
+                writer.write(data)
+
+    server = TimerServer(clock=loop.time, loop=loop, on_event=on_event)
+    for spec in args.timers:
+        name, _, path = spec.partition('=')
+        server.add(name, load_config(path or name), start=args.start)
+
+    def handle_line(writer, line):
+        words = line.split(maxsplit=1)
+        if not words:
+            return {'ok': False, 'error': f"expected: list | add NAME CONFIG | remove NAME | subscribe [NAME] | NAME {USAGE}"}
+        if words[0] == 'list':
+            return {'ok': True, 'timers': {name: status(t.engine) for name, t in server.timers.items()}}
+        if words[0] == 'subscribe':
+            subscribers[writer] = words[1] if len(words) > 1 else None
+            return {'ok': True}
+        if words[0] == 'add':
+            name, _, path = (words[1] if len(words) > 1 else '').partition(' ')
+            try:
+                server.add(name, read_config(path.strip()), start=args.start)
+            except (ConfigError, ValueError) as e:
+                return {'ok': False, 'error': str(e)}
+            return {'ok': True}
+        if words[0] == 'remove':
+            if len(words) < 2 or words[1] not in server.timers:
+                return {'ok': False, 'error': "no such timer"}
+            server.remove(words[1])
+            return {'ok': True}
+        return server.command(words[0], words[1] if len(words) > 1 else '')
+
+    async def handle_client(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(encode(handle_line(writer, line.decode(errors='replace').strip())))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            subscribers.pop(writer, None)
+            writer.close()
+
+    claim_socket(args.socket)
+    unix_server = await asyncio.start_unix_server(handle_client, args.socket)
+    os.chmod(args.socket, 0o600)
+    print(f"Serving {len(server.timers)} timers on {args.socket}")
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        server.close()
+        unix_server.close()
+        os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Host many independent Pomodoro timers in one process')
+    sub = parser.add_subparsers(dest='mode', required=True)
+    serve_parser = sub.add_parser('serve', help='Serve timers on a Unix socket')
+    serve_parser.add_argument('timers', nargs='*', metavar='NAME=CONFIG',
+                              help='Timers to host from the start')
+    serve_parser.add_argument('--socket', default=default_socket_path().replace('.sock', '-server.sock'),
+                              help='Control socket to serve (default: %(default)s)')
+    serve_parser.add_argument('--start', action='store_true',
+                              help='Start the initial timers right away')
+    bench_parser = sub.add_parser('benchmark', help='Run N timers through a day at virtual speed')
+    bench_parser.add_argument('--timers', '-n', type=int, default=10000,
+                              help='Number of timers (default: 10000)')
+    args = parser.parse_args()
+    if args.mode == 'benchmark':
+        benchmark(args.timers)
+    else:
+        asyncio.run(serve(args))
@@ -0,0 +1,110 @@
+import argparse
+import time
+from config import load_config
+from notifications import default_action
+from timer_engine import TimerEngine, DONE
+
+
+class SimulatedClock:
+    """Virtual monotonic clock that only moves when told to"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeNotifier:
+    """Records notifications and answers interactive ones like a user would.
+
+    `responder(title, actions)` returns the chosen action id, or None to let
+    the notification time out, which mirrors the desktop close handler:
+    focus checks auto-confirm and snooze prompts auto-deny.
+    """
+
+    def __init__(self, clock, responder=None):
+        self.clock = clock
+        self.responder = responder
+        self.shown = []
+        self.pending = []
+
+    def __call__(self, title, message, actions=None, timeout=None):
+        self.shown.append((self.clock(), title, message))
+        if not actions:
+            return
+        answer = self.responder(title, actions) if self.responder else None
+        if answer is None:
+            answer = default_action(actions)
+        self.pending.append(answer)
+
+
+class FakeSound:
+    """Records which cue was played and when"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.played = []
+
+    def __call__(self, name):
+        self.played.append((self.clock(), name))
+
+
+def run_day(config, responder=None, response_delay=0.0, max_steps=100000, listeners=()):
+    """Run one full day headless at virtual speed and return the engine.
+
+    Interactive notifications are answered after `response_delay` virtual
+    seconds and manual "Start Break"/"Start Next Session" steps are clicked
+    through immediately. `listeners` are attached to the engine before it
+    starts.
+    """
+    clock = SimulatedClock()
+    notifier = FakeNotifier(clock, responder)
+    sound = FakeSound(clock)
+    engine = TimerEngine(config, clock=clock, notify=notifier, play_sound=sound)
+    engine.notifier = notifier
+    engine.sound = sound
+    engine.listeners.extend(listeners)
+    engine.toggle()
+    for _ in range(max_steps):
+        if engine.state == DONE:
+            break
+        if notifier.pending:
+            clock.advance(response_delay)
+            engine.handle_action(notifier.pending.pop(0))
+            continue
+        delay = engine.next_wakeup()
+        if delay is None:
+            engine.toggle()
+            continue
+        clock.advance(delay)
+        engine.tick()
+    else:
+        raise RuntimeError(f"Day did not finish within {max_steps} steps")
+    return engine
+
+
+def benchmark(config, days):
+    """Return simulated days per second over `days` runs"""
+    start = time.perf_counter()
+    for _ in range(days):
+        run_day(config)
+    return days / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run Pomodoro days headless at virtual speed')
+    parser.add_argument('--config', '-c', default='pomodoro_config.json',
+                        help='Path to the configuration file (default: pomodoro_config.json)')
+    parser.add_argument('--days', type=int, default=1000,
+                        help='Number of simulated days for the benchmark (default: 1000)')
+    args = parser.parse_args()
+    config = load_config(args.config)
+    engine = run_day(config)
+    print(f"One day: {engine.clock() / 60:.1f} virtual minutes, "
+          f"{engine.total_work_elapsed / 60:.1f} worked, "
+          f"{len(engine.notifier.shown)} notifications, {len(engine.sound.played)} sounds")
+    print(f"Benchmark: {benchmark(config, args.days):.0f} simulated days/s")
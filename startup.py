@@ -0,0 +1,29 @@
+import time
+
+
+class StartupProfile:
+    """Wall-clock marks from the first import of main.py until the app is fully up.
+
+    Marking is a single perf_counter() call, so marks are always taken;
+    the report is only printed with --profile-startup.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.marks = []
+
+    def mark(self, label):
+        self.marks.append((label, self.clock()))
+
+    def report(self):
+        lines = ["Startup profile:"]
+        previous = self.started
+        for label, at in sorted(self.marks, key=lambda mark: mark[1]):
+            lines.append(f"  {label:<22} {(at - previous) * 1000:7.1f} ms"
+                         f"   (at {(at - self.started) * 1000:7.1f} ms)")
+            previous = at
+        return "\n".join(lines)
+
+
+profile = StartupProfile()
@@ -0,0 +1,279 @@
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import ConfigError, load_config, validate_config
+from simulation import SimulatedClock
+from timer_engine import TimerEngine, BREAK, DONE, EXTENDED, PROMPT, WORKING
+
+# Days simulated per pool task; small enough to balance the load, large
+# enough that pickling the task is negligible
+CHUNK_DAYS = 250
+# Break length at which BehaviorModel.break_keep applies as given
+BREAK_REFERENCE_MINUTES = 5
+
+
+class BehaviorModel:
+    """How the simulated user answers prompts and takes breaks.
+
+    `focus[i]` is the chance of having focused through work phase i (the
+    last entry also covers later phases and snoozes). With `fatigue` set,
+    that chance halves for every `fatigue` minutes worked since the last
+    full break. A break of BREAK_REFERENCE_MINUTES is kept with probability
+    `break_keep`, a longer one less often; a break that is not kept is
+    stopped at a random point, which only recovers part of the fatigue.
+    """
+
+    def __init__(self, focus=(0.8,), snooze=0.3, break_keep=0.9, fatigue=0.0, response_delay=10.0):
+        self.focus = tuple(focus)
+        self.snooze = snooze
+        self.break_keep = break_keep
+        self.fatigue = fatigue
+        self.response_delay = response_delay
+
+    @classmethod
+    def from_history(cls, report, **overrides):
+        """Model estimated from an analytics.HistoryReport; `overrides` win"""
+        data = report.as_dict()
+        rates = [row['focus_yes_rate'] for row in data['phases'] if row['focus_yes_rate'] is not None]
+        estimated = {}
+        if rates:
+            estimated['focus'] = rates
+        if data['snooze_yes_rate'] is not None:
+            estimated['snooze'] = data['snooze_yes_rate']
+        if data['breaks']['count']:
+            estimated['break_keep'] = 1 - data['breaks']['cut_short'] / data['breaks']['count']
+        estimated.update((key, value) for key, value in overrides.items() if value is not None)
+        return cls(**estimated)
+
+    def focus_probability(self, phase, worked_minutes):
+        chance = self.focus[min(phase, len(self.focus) - 1)]
+        if self.fatigue:
+            chance *= 0.5 ** (worked_minutes / self.fatigue)
+        return chance
+
+    def keep_probability(self, minutes):
+        return self.break_keep ** (minutes / BREAK_REFERENCE_MINUTES)
+
+    def describe(self):
+        focus = "/".join(f"{p:.2f}" for p in self.focus)
+        fatigue = f"halves every {self.fatigue:g} min" if self.fatigue else "off"
+        return (f"focus {focus}, snooze {self.snooze:.2f}, keeps a {BREAK_REFERENCE_MINUTES} min break "
+                f"{self.break_keep:.2f}, fatigue {fatigue}, answers after {self.response_delay:g} s")
+
+
+def simulate_day(config, model, rng, max_steps=100000):
+    """Run one day through the real TimerEngine with a simulated user.
+
+    Returns (focused, worked, break minutes taken, break minutes
+    configured, day length in minutes).
+    """
+    clock = SimulatedClock()
+    engine = TimerEngine(config, clock=clock)
+    focused = worked = taken = configured = 0.0
+    # Minutes worked since the last full break
+    tired = 0.0
+    focused_now = True
+    engine.toggle()
+    for _ in range(max_steps):
+        if engine.state == DONE:
+            break
+        if engine.state == PROMPT:
+            clock.advance(model.response_delay)
+            if engine.pending_prompt == "focus_check":
+                engine.handle_action("focus_yes" if focused_now else "focus_no")
+            else:
+                engine.handle_action("snooze_yes" if rng.random() < model.snooze else "snooze_no")
+            continue
+        if engine.state == BREAK and engine.phase_elapsed == 0:
+            length = engine.current_phase_duration
+            configured += length / 60
+            if rng.random() < model.keep_probability(length / 60):
+                clock.advance(length)
+                engine.tick()
+                taken += length / 60
+                tired = 0.0
+            else:
+                cut = length * rng.random()
+                clock.advance(cut)
+                engine.stop_session()
+                taken += cut / 60
+                tired *= 1 - cut / length
+            continue
+        delay = engine.next_wakeup()
+        if delay is None:
+            engine.toggle()
+            continue
+        working = engine.state in (WORKING, EXTENDED)
+        phase = engine.work_phase
+        minutes = engine.current_phase_duration / 60
+        # A float clock can land a hair before the boundary; the next step
+        # must still move it
+        clock.advance(max(delay, 1e-6))
+        engine.tick()
+        if working and engine.state not in (WORKING, EXTENDED):
+            worked += minutes
+            tired += minutes
+            focused_now = rng.random() < model.focus_probability(phase, tired)
+            if focused_now:
+                focused += minutes
+    else:
+        raise RuntimeError(f"Day did not finish within {max_steps} steps")
+    return focused, worked, taken, configured, clock() / 60
+
+
+def run_chunk(task):
+    """Pool task: simulate `days` days of one config and return the sums"""
+    index, config, model, days, seed = task
+    rng = random.Random(seed)
+    start = time.process_time()
+    totals = [0.0] * 5
+    for _ in range(days):
+        for i, value in enumerate(simulate_day(config, model, rng)):
+            totals[i] += value
+    return index, days, totals, time.process_time() - start
+
+
+def make_grid(base, work_phases=None, breaks=None, snooze_intervals=None, max_snoozes=None):
+    """Every combination of the given candidate values, on top of `base`"""
+    axes = (
+        ('work_phases', work_phases or [base['work_phases']]),
+        ('breaks', breaks or [base['breaks']]),
+        ('snooze_interval', snooze_intervals or [base['snooze_interval']]),
+        ('max_snoozes', max_snoozes or [base['max_snoozes']]),
+    )
+    grid = []
+    for values in itertools.product(*(candidates for _, candidates in axes)):
+        config = dict(base)
+        config.update(zip((key for key, _ in axes), values))
+        errors = validate_config(config)
+        if errors:
+            raise ConfigError(", ".join(errors))
+        grid.append(config)
+    return grid
+
+
+def sweep(grid, model, days, workers=None, seed=0):
+    """Simulate `days` days of every config in `grid` across a process pool.
+
+    Returns one result dict per config, in grid order, and the throughput
+    in simulated days per CPU-second. Each chunk has its own seed, so the
+    results do not depend on the number of workers.
+    """
+    tasks = []
+    for index, config in enumerate(grid):
+        for chunk, first in enumerate(range(0, days, CHUNK_DAYS)):
+            tasks.append((index, config, model, min(CHUNK_DAYS, days - first),
+                          f"{seed}/{index}/{chunk}"))
+    sums = [[0.0] * 5 for _ in grid]
+    cpu = 0.0
+    if workers == 1:
+        results = list(map(run_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(run_chunk, tasks))
+    for index, _, totals, seconds in results:
+        for i, value in enumerate(totals):
+            sums[index][i] += value
+        cpu += seconds
+    ranked = []
+    for config, (focused, worked, taken, configured, length) in zip(grid, sums):
+        ranked.append({
+            'config': config,
+            'focused_minutes': focused / days,
+            'worked_minutes': worked / days,
+            'break_compliance': taken / configured if configured else 1.0,
+            'day_minutes': length / days,
+        })
+    return ranked, days * len(grid) / cpu if cpu else 0.0
+
+
+def rank(results, min_compliance=0.0):
+    """Configs by focused minutes per day, then break compliance"""
+    eligible = [r for r in results if r['break_compliance'] >= min_compliance]
+    return sorted(eligible, key=lambda r: (-round(r['focused_minutes'], 1), -r['break_compliance']))
+
+
+def _minutes_list(text):
+    try:
+        return [float(value) if '.' in value else int(value) for value in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated minutes, got '{text}'")
+
+
+def _format_minutes(values):
+    return ",".join(f"{value:g}" for value in values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Rank candidate schedules by simulating days of a modelled user')
+    parser.add_argument('--config', '-c', default='pomodoro_config.json',
+                        help='Config the candidates are based on (default: pomodoro_config.json)')
+    parser.add_argument('--work-phases', nargs='+', type=_minutes_list, metavar='M,M,...',
+                        help='Candidate work_phases, e.g. 25,25,25 20,20,20,20')
+    parser.add_argument('--breaks', nargs='+', type=_minutes_list, metavar='M,M,...',
+                        help='Candidate breaks, e.g. 5,5,5,15 10,10,10,30')
+    parser.add_argument('--snooze-interval', nargs='+', type=float, metavar='M',
+                        help='Candidate snooze_interval values')
+    parser.add_argument('--max-snoozes', nargs='+', type=int, metavar='N',
+                        help='Candidate max_snoozes values')
+    parser.add_argument('--history', nargs='?', const=None, default=argparse.SUPPRESS,
+                        help='Estimate the user model from this session history '
+                             '(default when given without a path: the usual history journal)')
+    parser.add_argument('--focus', type=lambda text: [float(v) for v in text.split(',')],
+                        help='Chance of focusing through each phase, e.g. 0.9,0.8,0.7')
+    parser.add_argument('--snooze', type=float, help='Chance of accepting a snooze')
+    parser.add_argument('--break-keep', type=float,
+                        help=f'Chance of keeping a {BREAK_REFERENCE_MINUTES} minute break')
+    parser.add_argument('--fatigue', type=float,
+                        help='Minutes of work since the last full break after which focus halves')
+    parser.add_argument('--response-delay', type=float, help='Seconds until a prompt is answered')
+    parser.add_argument('--days', type=int, default=2000,
+                        help='Simulated days per candidate (default: 2000)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Worker processes (default: one per CPU, %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--min-compliance', type=float, default=0.0,
+                        help='Leave out candidates whose breaks are kept less than this share')
+    parser.add_argument('--top', type=int, default=10, help='Candidates to show (default: 10)')
+    args = parser.parse_args()
+
+    base = load_config(args.config)
+    try:
+        grid = make_grid(base, args.work_phases, args.breaks, args.snooze_interval, args.max_snoozes)
+    except ConfigError as e:
+        print(f"Error: invalid candidate: {e}")
+        sys.exit(1)
+    overrides = dict(focus=args.focus, snooze=args.snooze, break_keep=args.break_keep,
+                     fatigue=args.fatigue, response_delay=args.response_delay)
+    if 'history' in args:
+        from analytics import analyze
+        from journal import default_history_path
+        model = BehaviorModel.from_history(analyze(args.history or default_history_path()), **overrides)
+    else:
+        model = BehaviorModel(**{key: value for key, value in overrides.items() if value is not None})
+    print(f"User model: {model.describe()}")
+    print(f"Simulating {args.days} days for each of {len(grid)} candidates with {args.workers} workers")
+
+    start = time.perf_counter()
+    results, per_core = sweep(grid, model, args.days, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+    ranked = rank(results, args.min_compliance)
+
+    print(f"\n{'rank':>4}  {'work_phases':16} {'breaks':16} {'snooze':>6} {'max':>3}"
+          f"  {'focused':>8}  {'worked':>8}  {'breaks kept':>11}  {'day':>6}")
+    for position, result in enumerate(ranked[:args.top], start=1):
+        config = result['config']
+        print(f"{position:4}  {_format_minutes(config['work_phases']):16} {_format_minutes(config['breaks']):16}"
+              f" {config['snooze_interval']:6g} {config['max_snoozes']:3}"
+              f"  {result['focused_minutes']:8.1f}  {result['worked_minutes']:8.1f}"
+              f"  {result['break_compliance'] * 100:10.1f}%  {result['day_minutes'] / 60:5.1f}h")
+    if len(ranked) < len(results):
+        print(f"({len(results) - len(ranked)} candidates below --min-compliance left out)")
+    total = args.days * len(grid)
+    print(f"\n{total} simulated days in {elapsed:.1f} s: {per_core:.0f} days/s per core, "
+          f"{total / elapsed:.0f} days/s overall")
@@ -0,0 +1,110 @@
+import datetime
+import os
+import time
+import pytest
+from analytics import BATCH_RECORDS, analyze
+from config import load_config
+from journal import EVENT_CODES, RECORD, JournalReader, JournalWriter, index_path
+from simulation import run_day
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pomodoro_config.json')
+FIRST_DAY = datetime.date(2026, 3, 2)
+
+
+@pytest.fixture
+def config():
+    return load_config(CONFIG_PATH)
+
+
+def always_snooze(title, actions):
+    return "snooze_yes" if actions[0][0] == "snooze_yes" else None
+
+
+def unfocused_first(title, actions):
+    return "focus_no" if actions[0][0] == "focus_yes" else None
+
+
+RESPONDERS = [None, always_snooze, unfocused_first, lambda title, actions: None]
+
+
+def write_days(path, config, days, first=0):
+    """Journal `days` simulated days starting at 9:00 local time, one per
+    calendar day; returns the number of events recorded"""
+    current = {}
+    writer = JournalWriter(path, clock=lambda: current['start'] + current['engine'].clock())
+    events = []
+
+    def record(event, engine):
+        current['engine'] = engine
+        if event in EVENT_CODES:
+            events.append(event)
+        writer.record(event, engine)
+
+    for day in range(first, first + days):
+        date = FIRST_DAY + datetime.timedelta(days=day)
+        current['start'] = time.mktime((date.year, date.month, date.day, 9, 0, 0, 0, 0, -1))
+        run_day(config, RESPONDERS[day % len(RESPONDERS)], response_delay=day % 3 * 20,
+                listeners=[record])
+    writer.close()
+    return len(events)
+
+
+def test_journal_records_and_day_index(config, tmp_path):
+    path = str(tmp_path / 'history.bin')
+    recorded = write_days(path, config, 3)
+    # Reopening appends to both the records and the index
+    recorded += write_days(path, config, 2, first=3)
+    assert os.path.getsize(path) == recorded * RECORD.size
+    reader = JournalReader(path)
+    try:
+        assert len(reader) == recorded
+        days = reader.days()
+        assert sorted(days) == [FIRST_DAY + datetime.timedelta(days=day) for day in range(5)]
+        ranges = sorted(days.values())
+        assert ranges[0][0] == 0 and ranges[-1][1] == recorded
+        assert all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:]))
+        for date, (start, stop) in days.items():
+            records = list(reader.iter_day(date))
+            assert len(records) == stop - start
+            assert all(datetime.date.fromtimestamp(record[0]) == date for record in records)
+            assert records[0][1] == EVENT_CODES["phase_started"]
+            assert records[-1][1] == EVENT_CODES["finished"]
+    finally:
+        reader.close()
+    with open(index_path(path), 'rb') as f:
+        assert len(f.read()) == 5 * 12
+
+
+def test_analyze_is_independent_of_the_batch_size(config, tmp_path):
+    path = str(tmp_path / 'history.bin')
+    days = 8
+    recorded = write_days(path, config, days)
+    reports = {size: analyze(path, size).as_dict() for size in (1, 2, 7, 64, BATCH_RECORDS)}
+    expected = reports.pop(BATCH_RECORDS)
+    for size, report in reports.items():
+        assert report == expected, f"batch_records={size}"
+
+    sessions = days * config['daily_sessions']
+    assert expected['records'] == recorded
+    assert sum(row['completed'] for row in expected['sessions']) == sessions
+    assert expected['breaks']['count'] == sessions
+    # Every session starts with phase 1, which is only answered "no" on unfocused days
+    first = expected['phases'][0]
+    assert first['count'] == sessions
+    assert first['configured_minutes'] == config['work_phases'][0]
+    assert first['focus_answers'] == sessions
+    assert first['focus_yes_rate'] == pytest.approx(1 - 2 / days)
+    # Snoozing days take every snooze; unfocused days never reach the prompt
+    snooze_yes = 2 * config['daily_sessions'] * config['max_snoozes']
+    snooze_no = 4 * config['daily_sessions']
+    assert expected['snooze_prompts'] == snooze_yes + snooze_no
+    assert expected['snooze_yes_rate'] == pytest.approx(snooze_yes / (snooze_yes + snooze_no))
+    assert sum(map(sum, expected['work_minutes_by_weekday_hour'])) > 0
+
+
+def test_analyze_an_empty_journal(tmp_path):
+    path = str(tmp_path / 'history.bin')
+    JournalWriter(path).close()
+    report = analyze(path)
+    assert report.records == 0
+    assert report.render() == "No history recorded yet"
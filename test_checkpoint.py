@@ -0,0 +1,159 @@
+import os
+import pytest
+from checkpoint import CRC, RECORD, CheckpointWriter, load_checkpoint, snapshot
+from config import load_config
+from simulation import SimulatedClock, run_day
+from timer_engine import (AWAIT_SESSION, BREAK, DONE, EXTENDED, IDLE, PROMPT, WORKING,
+                          TimerEngine)
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pomodoro_config.json')
+
+
+@pytest.fixture
+def config():
+    return load_config(CONFIG_PATH)
+
+
+def make_engine(config):
+    clock = SimulatedClock()
+    return TimerEngine(config, clock=clock), clock
+
+
+def idle(engine, clock):
+    pass
+
+
+def working(engine, clock):
+    engine.toggle()
+    clock.advance(300)
+    engine.tick()
+
+
+def paused(engine, clock):
+    working(engine, clock)
+    engine.toggle_pause()
+
+
+def prompt(engine, clock):
+    engine.toggle()
+    clock.advance(600)
+    engine.tick()
+
+
+def extended(engine, clock):
+    engine.select_phase(2)
+    engine.toggle()
+    clock.advance(1200)
+    engine.tick()
+    engine.handle_action("snooze_yes")
+    clock.advance(60)
+
+
+def on_break(engine, clock):
+    engine.select_phase(2)
+    engine.toggle()
+    clock.advance(1200)
+    engine.tick()
+    engine.handle_action("snooze_no")
+    clock.advance(30)
+
+
+def await_session(engine, clock):
+    on_break(engine, clock)
+    clock.advance(300)
+    engine.tick()
+
+
+POSITIONS = [
+    (idle, IDLE), (working, WORKING), (paused, WORKING), (prompt, PROMPT),
+    (extended, EXTENDED), (on_break, BREAK), (await_session, AWAIT_SESSION),
+]
+
+
+def position(engine):
+    return (engine.state, engine.paused, engine.active, engine.session, engine.work_phase,
+            engine.snooze_count, engine.current_phase_duration, engine.phase_elapsed,
+            engine.session_elapsed, engine.total_work_elapsed)
+
+
+def save(state, path):
+    writer = CheckpointWriter(str(path))
+    writer.save(state)
+    writer.close()
+    assert writer.writes == 1
+
+
+@pytest.mark.parametrize("drive, state", POSITIONS, ids=[drive.__name__ for drive, _ in POSITIONS])
+def test_restore_continues_where_the_checkpoint_left_off(config, tmp_path, drive, state):
+    engine, clock = make_engine(config)
+    drive(engine, clock)
+    assert engine.state == state
+    saved = snapshot(engine)
+    path = tmp_path / 'checkpoint.bin'
+    save(saved, path)
+
+    restored, restored_clock = make_engine(config)
+    loaded = load_checkpoint(str(path))
+    restored.restore(loaded, now=loaded.saved_at)
+    assert position(restored) == position(engine)
+    if state == PROMPT:
+        # The prompt is asked again in the new process
+        assert restored.popup_active
+
+    # Both engines carry on the same way from there
+    clock.advance(300)
+    restored_clock.advance(300)
+    engine.tick()
+    restored.tick()
+    assert position(restored) == position(engine)
+
+
+def test_restore_counts_the_downtime_of_a_running_clock(config):
+    engine, clock = make_engine(config)
+    working(engine, clock)
+    saved = snapshot(engine)
+    restored, _ = make_engine(config)
+    restored.restore(saved, now=saved.saved_at + 50)
+    assert restored.phase_elapsed == 350
+    assert restored.total_work_elapsed == 350
+
+
+def test_restore_a_finished_day(config, tmp_path):
+    engine = run_day(config)
+    assert engine.state == DONE
+    path = tmp_path / 'checkpoint.bin'
+    save(snapshot(engine), path)
+    restored, _ = make_engine(config)
+    restored.restore(load_checkpoint(str(path)))
+    assert restored.state == DONE and not restored.active
+    assert restored.total_work_elapsed == engine.total_work_elapsed
+
+
+def test_missing_checkpoint(tmp_path):
+    assert load_checkpoint(str(tmp_path / 'checkpoint.bin')) is None
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:RECORD.size],
+    lambda data: data[:-1],
+    lambda data: b'',
+    lambda data: data[:10] + bytes([data[10] ^ 0xff]) + data[11:],
+    lambda data: data[:RECORD.size] + bytes(CRC.size),
+], ids=["no-crc", "truncated", "empty", "flipped-byte", "bad-crc"])
+def test_damaged_checkpoint_is_ignored(config, tmp_path, damage, capsys):
+    engine, clock = make_engine(config)
+    working(engine, clock)
+    path = tmp_path / 'checkpoint.bin'
+    save(snapshot(engine), path)
+    path.write_bytes(damage(path.read_bytes()))
+    assert load_checkpoint(str(path)) is None
+    assert "ignoring checkpoint" in capsys.readouterr().out
+
+
+def test_checkpoint_from_another_config_is_refused(config):
+    engine, clock = make_engine(config)
+    engine.select_phase(2)
+    saved = snapshot(engine)
+    restored, _ = make_engine(dict(config, work_phases=[25]))
+    with pytest.raises(ValueError):
+        restored.restore(saved)
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import stat
+import pytest
+from notifications import NotificationRequest, NotifySendBackend
+
+PROMPT = [("focus_yes", "Yes"), ("focus_no", "No")]
+
+
+@pytest.fixture
+def notify_send(tmp_path, monkeypatch):
+    """Install a fake notify-send that logs its arguments and runs `body`"""
+    log = tmp_path / 'calls'
+
+    def install(body):
+        script = tmp_path / 'notify-send'
+        script.write_text(f'#!/bin/sh\necho "$@" >> {log}\n{body}\n')
+        script.chmod(script.stat().st_mode | stat.S_IXUSR)
+        monkeypatch.setenv('PATH', f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+        return log
+    return install
+
+
+def ask(request, answers):
+    async def run():
+        answered = asyncio.Event()
+
+        def on_action(action_id):
+            answers.append(action_id)
+            answered.set()
+
+        backend = NotifySendBackend(on_action)
+        await backend.show(request)
+        await asyncio.wait_for(answered.wait(), 2)
+        return backend
+    return asyncio.run(run())
+
+
+def test_answer_is_read_from_stdout(notify_send):
+    notify_send('echo focus_no')
+    answers = []
+    backend = ask(NotificationRequest("Focus?", "Still focused?", PROMPT), answers)
+    assert answers == ["focus_no"]
+    assert backend.actions_supported
+
+
+def test_unknown_output_takes_the_default(notify_send):
+    notify_send('echo')
+    answers = []
+    ask(NotificationRequest("Focus?", "Still focused?", PROMPT), answers)
+    assert answers == ["focus_yes"]
+
+
+def test_rejected_actions_fall_back_to_a_plain_prompt(notify_send):
+    # libnotify before 0.7.10 has no --action and exits with an error
+    log = notify_send('case "$*" in *--action*) exit 1;; esac')
+    answers = []
+    backend = ask(NotificationRequest("Focus?", "Still focused?", PROMPT, timeout=10), answers)
+    assert answers == ["focus_yes"]
+    assert not backend.actions_supported
+    first, second = log.read_text().splitlines()
+    assert "--action=focus_yes=Yes" in first
+    assert "--action" not in second and "Still focused?" in second
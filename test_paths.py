@@ -0,0 +1,40 @@
+import os
+import stat
+import pytest
+from paths import runtime_dir
+
+
+def test_runtime_dir_is_created_private(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    path = runtime_dir()
+    assert path == str(tmp_path / 'dynamictimer')
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+    assert runtime_dir() == path
+
+
+def test_runtime_dir_is_tightened(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    (tmp_path / 'dynamictimer').mkdir(mode=0o777)
+    os.chmod(tmp_path / 'dynamictimer', 0o777)
+    assert stat.S_IMODE(os.stat(runtime_dir()).st_mode) == 0o700
+
+
+def test_runtime_dir_refuses_a_symlink(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    (tmp_path / 'elsewhere').mkdir()
+    (tmp_path / 'dynamictimer').symlink_to(tmp_path / 'elsewhere')
+    with pytest.raises(PermissionError):
+        runtime_dir()
+
+
+def test_runtime_dir_refuses_another_owner(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    monkeypatch.setattr(os, 'getuid', lambda: os.stat(tmp_path).st_uid + 1)
+    (tmp_path / 'dynamictimer').mkdir()
+    with pytest.raises(PermissionError):
+        runtime_dir()
+
+
+def test_runtime_dir_without_xdg(monkeypatch):
+    monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+    assert runtime_dir() == f"/tmp/dynamictimer-{os.getuid()}"
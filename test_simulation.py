@@ -0,0 +1,104 @@
+import os
+import pytest
+from config import load_config
+from simulation import run_day
+from timer_engine import DONE
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pomodoro_config.json')
+
+
+@pytest.fixture
+def config():
+    return load_config(CONFIG_PATH)
+
+
+def minutes(values):
+    return sum(values) * 60
+
+
+def day_length(config):
+    """Seconds of the nominal day: all work phases and breaks, no snoozes"""
+    breaks = [config['breaks'][s % len(config['breaks'])] for s in range(config['daily_sessions'])]
+    return config['daily_sessions'] * minutes(config['work_phases']) + minutes(breaks)
+
+
+def run_recorded(config, responder=None, response_delay=0.0):
+    """run_day with every engine event recorded as (virtual time, event)"""
+    events = []
+    engine = run_day(config, responder, response_delay,
+                     listeners=[lambda event, engine: events.append((engine.clock(), event))])
+    return engine, events
+
+
+def session_events(config, snoozes=0):
+    phases = ["phase_started", "focus_check", "focus_yes"] * (len(config['work_phases']) - 1)
+    last = ["phase_started"] + ["snooze_prompt", "snooze_yes", "snooze_started"] * snoozes
+    if snoozes < config['max_snoozes']:
+        last += ["snooze_prompt", "snooze_no"]
+    return phases + last + ["break_started"]
+
+
+def test_default_day_transitions(config):
+    engine, events = run_recorded(config)
+    assert engine.state == DONE
+    names = [event for _, event in events]
+    expected = []
+    for session in range(config['daily_sessions']):
+        if session:
+            expected.append("session_started")
+        expected += session_events(config)
+        # auto_start_sessions is off: the break ends and waits for a click
+        expected.append("break_over")
+    expected.append("finished")
+    assert names == expected
+
+
+def test_default_day_timing(config):
+    engine, events = run_recorded(config)
+    work = minutes(config['work_phases'])
+    breaks = [config['breaks'][s % len(config['breaks'])] for s in range(config['daily_sessions'])]
+    assert engine.total_work_elapsed == config['daily_sessions'] * work
+    assert engine.clock() == day_length(config)
+    # Each phase ends exactly on its configured boundary
+    prompts = [at for at, event in events if event in ("focus_check", "snooze_prompt")]
+    assert prompts[:3] == [600, 1500, 2700]
+    starts = [at for at, event in events if event == "break_started"]
+    assert starts[0] == work
+    assert [at for at, event in events if event == "session_started"][0] == work + minutes(breaks[:1])
+
+
+def test_prompt_timeout_takes_default_answers(config):
+    # No answer: focus checks confirm and snooze prompts decline, as on timeout
+    engine, events = run_recorded(config, responder=lambda title, actions: None, response_delay=10)
+    names = [event for _, event in events]
+    assert names.count("focus_yes") == 2 * config['daily_sessions']
+    assert names.count("snooze_no") == config['daily_sessions']
+    assert "snooze_yes" not in names and "focus_no" not in names
+    # The clock stands still while a prompt waits, so waiting is not work
+    assert engine.total_work_elapsed == config['daily_sessions'] * minutes(config['work_phases'])
+    prompts = 3 * config['daily_sessions']
+    assert engine.clock() == pytest.approx(day_length(config) + 10 * prompts)
+
+
+def test_snoozes_until_the_limit(config):
+    def always_snooze(title, actions):
+        return "snooze_yes" if actions[0][0] == "snooze_yes" else None
+
+    engine, events = run_recorded(config, responder=always_snooze)
+    names = [event for _, event in events]
+    assert names.count("snooze_started") == config['max_snoozes'] * config['daily_sessions']
+    assert "snooze_no" not in names
+    first_break = names.index("break_started")
+    assert names[:first_break + 1] == session_events(config, snoozes=config['max_snoozes'])
+    extra = minutes([config['snooze_interval']] * config['max_snoozes'])
+    assert engine.total_work_elapsed == config['daily_sessions'] * (minutes(config['work_phases']) + extra)
+
+
+def test_unfocused_phase_goes_straight_to_break(config):
+    engine, events = run_recorded(config, responder=lambda title, actions: "focus_no"
+                                  if actions[0][0] == "focus_yes" else None)
+    names = [event for _, event in events]
+    assert names[:4] == ["phase_started", "focus_check", "focus_no", "break_started"]
+    assert engine.total_work_elapsed == config['daily_sessions'] * minutes(config['work_phases'][:1])
+    assert engine.notifier.shown[-1][1] == "Pomodoro Finished"
+    assert [name for _, name in engine.sound.played].count("gong") == config['daily_sessions']
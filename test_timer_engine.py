@@ -0,0 +1,300 @@
+import math
+import os
+import pytest
+from config import load_config
+from control import execute
+from gaps import GapDetector
+from simulation import SimulatedClock
+from timeline import ScheduleTimeline
+from timer_engine import AWAIT_SESSION, BREAK, DONE, EXTENDED, PROMPT, WORKING, TimerEngine
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pomodoro_config.json')
+
+
+@pytest.fixture
+def config():
+    return load_config(CONFIG_PATH)
+
+
+def make_engine(config, **overrides):
+    clock = SimulatedClock()
+    engine = TimerEngine(dict(config, **overrides), clock=clock)
+    return engine, clock
+
+
+@pytest.mark.parametrize("minutes, resolution", [(1.5, 60), (0.5, 60), (2.25, 60), (0.75, 1)])
+def test_countdown_wakeups_follow_the_rounded_remaining_time(config, minutes, resolution):
+    # A panel or tray shows ceil(remaining / resolution); waking only when
+    # that value changes must never leave it showing a stale step
+    engine, clock = make_engine(config, work_phases=[minutes])
+    engine.toggle()
+    duration = engine.current_phase_duration
+    shown = math.ceil(engine.remaining / resolution)
+    wakeups = []
+    next_at = engine.next_wakeup(resolution)
+    step = 0.25
+    while clock() < duration:
+        if clock() >= next_at - 1e-9:
+            shown = math.ceil(engine.remaining / resolution)
+            wakeups.append(round(clock(), 6))
+            next_at = clock() + engine.next_wakeup(resolution)
+        assert shown == math.ceil(engine.remaining / resolution), f"stale at {clock()} s"
+        clock.advance(step)
+    # One wakeup per change of the displayed value before the phase ends
+    assert len(wakeups) == math.ceil(duration / resolution) - 1
+    assert engine.state == WORKING
+
+
+# -- Catching up on gaps ----------------------------------------------------
+
+def suspend(engine, clock, elapsed, gap):
+    """Run `elapsed` seconds, then let `gap` seconds pass unseen and reconcile"""
+    clock.advance(elapsed + gap)
+    return engine.reconcile(gap)
+
+
+def test_hold_ends_at_the_boundary_and_drops_the_rest(config):
+    engine, clock = make_engine(config, catch_up='hold')
+    engine.toggle()
+    assert suspend(engine, clock, 300, 7200) == 1
+    assert engine.state == PROMPT and engine.pending_prompt == "focus_check"
+    assert engine.phase_elapsed == 600
+    assert engine.total_work_elapsed == 600
+
+
+def test_hold_inside_the_phase_counts_the_gap(config):
+    engine, clock = make_engine(config, catch_up='hold')
+    engine.toggle()
+    assert suspend(engine, clock, 100, 200) == 0
+    assert engine.state == WORKING
+    assert engine.phase_elapsed == 300
+    assert engine.total_work_elapsed == 300
+
+
+def test_pause_drops_the_gap(config):
+    engine, clock = make_engine(config, catch_up='pause')
+    engine.toggle()
+    assert suspend(engine, clock, 300, 7200) == 0
+    assert engine.state == WORKING
+    assert engine.phase_elapsed == 300
+    assert engine.total_work_elapsed == 300
+    clock.advance(300)
+    engine.tick()
+    assert engine.state == PROMPT and engine.total_work_elapsed == 600
+
+
+def test_pause_never_takes_back_more_than_ran(config):
+    engine, clock = make_engine(config, catch_up='pause')
+    engine.toggle()
+    clock.advance(100)
+    engine.toggle_pause()
+    engine.toggle_pause()
+    # Only 50 s have run since the clock last started
+    clock.advance(50)
+    engine.reconcile(500)
+    assert engine.phase_elapsed == 100
+    assert engine.total_work_elapsed == 100
+
+
+def test_replay_passes_every_boundary_in_the_gap(config):
+    engine, clock = make_engine(config, catch_up='replay', auto_start_sessions=True)
+    shown = []
+    engine.notify = lambda title, *args, **kwargs: shown.append(title)
+    engine.toggle()
+    shown.clear()
+    # 7600 s: session 1 (2700 work + 300 break), session 2 (2700 + 1200),
+    # then session 3 phase 1 (600) and 100 s into phase 2
+    crossed = suspend(engine, clock, 300, 7300)
+    assert crossed == 9
+    assert engine.state == WORKING
+    assert (engine.session, engine.work_phase) == (2, 1)
+    assert engine.phase_elapsed == 100
+    assert engine.total_work_elapsed == 2 * 2700 + 600 + 100
+    # Only the last notification of the burst is delivered
+    assert shown == ["Work Started"]
+
+
+def test_replay_stops_where_the_user_must_act(config):
+    engine, clock = make_engine(config, catch_up='replay', auto_start_sessions=False)
+    engine.toggle()
+    assert suspend(engine, clock, 300, 7300) == 4
+    assert engine.state == AWAIT_SESSION
+    assert engine.session == 0
+    assert engine.phase_elapsed == 300
+    assert engine.total_work_elapsed == 2700
+
+
+def test_replay_finishes_a_snooze_and_declines_the_next(config):
+    engine, clock = make_engine(config, catch_up='replay')
+    engine.select_phase(2)
+    engine.toggle()
+    clock.advance(1200)
+    engine.tick()
+    engine.handle_action("snooze_yes")
+    assert engine.state == EXTENDED
+    assert suspend(engine, clock, 0, 400) == 1
+    assert engine.state == BREAK
+    assert engine.phase_elapsed == 100
+    assert engine.total_work_elapsed == 1200 + 300
+
+
+def test_reconcile_leaves_a_stopped_clock_alone(config):
+    engine, clock = make_engine(config, catch_up='replay')
+    engine.toggle()
+    clock.advance(100)
+    engine.toggle_pause()
+    clock.advance(7200)
+    assert engine.reconcile(7200) == 0
+    assert engine.paused and engine.phase_elapsed == 100
+
+
+class FakeClocks:
+    """Monotonic and boot-time clocks; only the boot-time one counts suspends"""
+
+    def __init__(self):
+        self.mono = 0.0
+        self.boot = 0.0
+
+    def run(self, seconds):
+        self.mono += seconds
+        self.boot += seconds
+
+    def sleep(self, seconds):
+        self.boot += seconds
+
+
+def detector_engine(config, policy):
+    clocks = FakeClocks()
+    engine = TimerEngine(dict(config, catch_up=policy), clock=lambda: clocks.boot)
+    gaps = GapDetector(monotonic=lambda: clocks.mono, boottime=lambda: clocks.boot)
+    engine.listeners.append(gaps.on_engine_event)
+    return engine, gaps, clocks
+
+
+def test_detector_reconciles_a_suspend(config):
+    engine, gaps, clocks = detector_engine(config, 'pause')
+    engine.toggle()
+    clocks.run(100)
+    clocks.sleep(3600)
+    clocks.run(50)
+    gaps.tick(engine, due=clocks.mono)
+    assert engine.state == WORKING
+    assert engine.phase_elapsed == 150
+    assert engine.total_work_elapsed == 150
+    assert (gaps.suspends, gaps.suspended) == (1, 3600)
+
+
+def test_detector_ignores_a_suspend_while_paused(config):
+    engine, gaps, clocks = detector_engine(config, 'pause')
+    engine.toggle()
+    clocks.run(100)
+    engine.toggle_pause()
+    clocks.sleep(3600)
+    engine.toggle_pause()
+    clocks.run(50)
+    gaps.tick(engine, due=clocks.mono)
+    assert engine.phase_elapsed == 150
+    assert gaps.suspends == 0
+
+
+def test_detector_reconciles_a_late_wakeup(config):
+    engine, gaps, clocks = detector_engine(config, 'hold')
+    engine.toggle()
+    due = clocks.mono + engine.next_wakeup()
+    # The event loop was blocked for 30 s past the boundary
+    clocks.run(600 + 30)
+    gaps.tick(engine, due=due)
+    assert engine.state == PROMPT
+    assert engine.total_work_elapsed == 600
+    assert (gaps.stalls, gaps.stalled) == (1, 30)
+
+
+def test_detector_lets_jitter_through_as_a_plain_tick(config):
+    engine, gaps, clocks = detector_engine(config, 'pause')
+    engine.toggle()
+    due = clocks.mono + engine.next_wakeup()
+    clocks.run(600.2)
+    gaps.tick(engine, due=due)
+    assert engine.state == PROMPT
+    assert (gaps.suspends, gaps.stalls) == (0, 0)
+
+
+# -- Seeking on the timeline ------------------------------------------------
+
+# pomodoro_config.json: phases of 600, 900 and 1200 s, then breaks of 300,
+# 1200, 300 and 3600 s; sessions start at 0, 3000, 6900 and 9900 s
+@pytest.mark.parametrize("offset, located", [
+    (0, (0, 0, 600)),
+    (599.5, (0, 0, 0.5)),
+    (600, (0, 1, 900)),
+    (2700, (0, 3, 300)),
+    (2999, (0, 3, 1)),
+    (3000, (1, 0, 600)),
+    (16199, (3, 3, 1)),
+    (16200, (4, 0, 0)),
+    (99999, (4, 0, 0)),
+])
+def test_locate_at_boundaries(config, offset, located):
+    assert ScheduleTimeline(config).locate(offset) == located
+
+
+@pytest.mark.parametrize("offset, state, session, phase, elapsed, work", [
+    (600, WORKING, 0, 1, 0, 600),
+    (2699, WORKING, 0, 2, 1199, 2699),
+    (2700, BREAK, 0, 2, 0, 2700),
+    (2850, BREAK, 0, 2, 150, 2700),
+    (3000, WORKING, 1, 0, 0, 2700),
+    (16200, DONE, 4, None, 0, 4 * 2700),
+])
+def test_seek_lands_on_the_located_segment(config, offset, state, session, phase, elapsed, work):
+    engine, clock = make_engine(config)
+    engine.seek(offset)
+    assert engine.state == state
+    assert engine.session == session
+    if phase is not None:
+        assert engine.work_phase == phase
+    assert engine.phase_elapsed == elapsed
+    assert engine.total_work_elapsed == work
+    assert engine.day_offset == offset
+
+
+def test_seek_keeps_running_into_the_next_boundary(config):
+    engine, clock = make_engine(config)
+    engine.seek(2699)
+    clock.advance(1)
+    engine.tick()
+    assert engine.state == PROMPT and engine.pending_prompt == "snooze_prompt"
+
+
+def test_day_offset_round_trips_through_seek(config):
+    engine, _ = make_engine(config)
+    for offset in range(0, engine.timeline.day_length, 150):
+        engine.seek(offset)
+        assert engine.day_offset == offset
+
+
+def test_fast_forward_out_of_a_snooze_counts_from_the_break(config):
+    engine, clock = make_engine(config)
+    engine.select_phase(2)
+    engine.toggle()
+    clock.advance(1200)
+    engine.tick()
+    engine.handle_action("snooze_yes")
+    clock.advance(100)
+    assert engine.state == EXTENDED and engine.day_offset == 2700
+    engine.fast_forward(60)
+    assert engine.state == BREAK
+    assert engine.phase_elapsed == 60
+    assert engine.snooze_count == 0
+
+
+def test_seek_and_fast_forward_commands(config):
+    engine, _ = make_engine(config)
+    reply = execute(engine, "seek 45")
+    assert reply['ok'] and reply['status']['state'] == BREAK
+    reply = execute(engine, "fast-forward 5")
+    assert reply['ok'] and reply['status']['session'] == 2
+    for line in ("seek", "seek -1", "seek nan", "fast-forward soon"):
+        assert not execute(engine, line)['ok'], line
+    execute(engine, "seek 1000")
+    assert not execute(engine, "fast-forward 1")['ok']
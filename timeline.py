@@ -0,0 +1,72 @@
+from array import array
+from bisect import bisect_right
+
+
+class ScheduleTimeline:
+    """The configured day compiled once into flat arrays of boundaries.
+
+    The nominal day (no snoozes) is laid out as consecutive segments: each
+    session's work phases followed by its break. `boundaries[i]` is the
+    offset in seconds at which segment i ends, so "where am I at offset t"
+    is a binary search and "what offset is session s, phase p" is a pair of
+    array lookups. A phase index equal to `total_phases` denotes the break.
+    """
+
+    def __init__(self, config):
+        work_phases = config['work_phases']
+        breaks = config['breaks']
+        self.daily_sessions = config['daily_sessions']
+        self.total_phases = len(work_phases)
+        self.break_phase = self.total_phases
+        self.phase_seconds = array('l', (int(m * 60) for m in work_phases))
+        self.snooze_seconds = int(config['snooze_interval'] * 60)
+        self.break_seconds = array('l', (
+            int(breaks[s % len(breaks)] * 60) for s in range(self.daily_sessions)
+        ))
+        # Offset of each phase (and the break) from the start of a session
+        self.phase_starts = array('l', [0])
+        for seconds in self.phase_seconds:
+            self.phase_starts.append(self.phase_starts[-1] + seconds)
+        self.work_per_session = self.phase_starts[-1]
+        self.session_starts = array('l', [0])
+        for seconds in self.break_seconds:
+            self.session_starts.append(self.session_starts[-1] + self.work_per_session + seconds)
+        self.day_length = self.session_starts[-1]
+
+        self.boundaries = array('l')
+        self.segment_session = array('l')
+        self.segment_phase = array('l')
+        for session in range(self.daily_sessions):
+            for phase in range(self.total_phases + 1):
+                self.boundaries.append(self.offset_of(session, phase) + self.duration(session, phase))
+                self.segment_session.append(session)
+                self.segment_phase.append(phase)
+
+    def duration(self, session, phase):
+        """Length in seconds of a work phase, or of the session's break"""
+        if phase == self.break_phase:
+            return self.break_seconds[session]
+        return self.phase_seconds[phase]
+
+    def offset_of(self, session, phase, elapsed=0):
+        """Offset into the nominal day of `elapsed` seconds into a phase"""
+        return self.session_starts[session] + self.phase_starts[phase] + elapsed
+
+    def work_before(self, session):
+        """Nominal work seconds completed before `session` starts"""
+        return session * self.work_per_session
+
+    def locate(self, offset):
+        """Return (session, phase, remaining seconds) at `offset` into the day.
+
+        Offsets at or past the end of the day yield (daily_sessions, 0, 0).
+        """
+        idx = bisect_right(self.boundaries, offset)
+        if idx >= len(self.boundaries):
+            return self.daily_sessions, 0, 0
+        return (self.segment_session[idx], self.segment_phase[idx],
+                self.boundaries[idx] - offset)
+
+    def remaining_after(self, offset):
+        """Seconds left in the nominal day from `offset`"""
+        return max(self.day_length - offset, 0)
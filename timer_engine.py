@@ -0,0 +1,540 @@
+import time
+from timeline import ScheduleTimeline
+
+IDLE = "idle"
+WORKING = "working"
+EXTENDED = "extended"
+PROMPT = "prompt"
+BREAK = "break"
+AWAIT_BREAK = "await_break"
+AWAIT_SESSION = "await_session"
+DONE = "done"
+
+STATES = (IDLE, WORKING, EXTENDED, PROMPT, BREAK, AWAIT_BREAK, AWAIT_SESSION, DONE)
+
+BREAK_STATES = (BREAK, AWAIT_SESSION)
+
+# Prompt each notification answer belongs to
+ACTION_PROMPTS = {
+    "focus_yes": "focus_check", "focus_no": "focus_check",
+    "snooze_yes": "snooze_prompt", "snooze_no": "snooze_prompt",
+}
+
+# Answer to a prompt that came and went unseen, as for an unanswered
+# notification: focus checks confirm, snooze prompts deny
+DEFAULT_ANSWERS = {"focus_check": "focus_yes", "snooze_prompt": "snooze_no"}
+
+
+if hasattr(time, 'CLOCK_BOOTTIME'):
+    def boot_clock():
+        """Like time.monotonic(), but keeps counting while the machine is suspended"""
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+else:  # not Linux: suspended time goes unseen
+    boot_clock = time.monotonic
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+class TimerEngine:
+    """Headless Pomodoro state machine.
+
+    Elapsed time is derived from clock deltas instead of counting ticks, so
+    late or coalesced wakeups never lose time; the default clock includes
+    time spent suspended. Side effects go through the
+    notify/play_sound hooks and every transition is announced to listeners,
+    which is all a view needs to render itself.
+    """
+
+    def __init__(self, config, clock=boot_clock, notify=None, play_sound=None):
+        self.clock = clock
+        self.notify = notify or _noop
+        self.play_sound = play_sound or _noop
+        self.listeners = []
+        self._load_config(config)
+        self.state = IDLE
+        self.paused = False
+        self._was_running = False
+        self.popup_active = False
+        self.session = 0
+        self.work_phase = 0
+        self.snooze_count = 0
+        self.current_phase_duration = self.timeline.phase_seconds[0]
+        # Elapsed counters are folded into these bases whenever the clock
+        # stops; while running, the live value is base + (now - anchor).
+        self._anchor = None
+        self._phase_base = 0.0
+        self._session_base = 0.0
+        self._total_base = 0.0
+
+    def _load_config(self, config):
+        self.auto_start_breaks = config.get('auto_start_breaks', True)
+        self.auto_start_sessions = config.get('auto_start_sessions', True)
+        self.work_phases = config['work_phases']
+        self.breaks = config['breaks']
+        self.snooze_interval = config['snooze_interval']
+        self.max_snoozes = config['max_snoozes']
+        self.daily_sessions = config['daily_sessions']
+        self.catch_up = config.get('catch_up', 'hold')
+        self.total_phases = len(self.work_phases)
+        self.timeline = ScheduleTimeline(config)
+
+    def apply_config(self, config):
+        """Switch to a new schedule in place, keeping the current position.
+
+        Indices are clamped to the new schedule and the running phase,
+        snooze or break takes its new length; if that is already used up,
+        the next tick ends it.
+        """
+        self._load_config(config)
+        if self.state != DONE:
+            self.session = min(self.session, self.daily_sessions - 1)
+        self.work_phase = min(self.work_phase, self.total_phases - 1)
+        if self.state == EXTENDED:
+            self.current_phase_duration = self.timeline.snooze_seconds
+        elif self.break_active:
+            self.current_phase_duration = self.timeline.break_seconds[self.session]
+        elif self.state in (IDLE, WORKING, PROMPT):
+            self.current_phase_duration = self.timeline.phase_seconds[self.work_phase]
+        self._emit("config_reloaded")
+
+    # -- Elapsed time -------------------------------------------------------
+
+    @property
+    def running(self):
+        return self._anchor is not None
+
+    @property
+    def active(self):
+        """Whether the phase clock runs, or will run again once unpaused"""
+        return self.running or (self.paused and self._was_running)
+
+    def _delta(self):
+        return self.clock() - self._anchor if self._anchor is not None else 0.0
+
+    def _counts_work(self):
+        return self.state in (WORKING, EXTENDED)
+
+    @property
+    def phase_elapsed(self):
+        return self._phase_base + self._delta()
+
+    @property
+    def session_elapsed(self):
+        if self._counts_work():
+            return self._session_base + self._delta()
+        return self._session_base
+
+    @property
+    def total_work_elapsed(self):
+        if self._counts_work():
+            return self._total_base + self._delta()
+        return self._total_base
+
+    @property
+    def remaining(self):
+        return max(self.current_phase_duration - self.phase_elapsed, 0)
+
+    def next_wakeup(self, resolution=None):
+        """Seconds until the next moment worth waking up for, or None when stopped.
+
+        Without a resolution only the end of the running phase, snooze or
+        break counts; with one, the next moment the remaining time reaches a
+        multiple of `resolution` seconds (i.e. the next change of a countdown
+        rounded up to `resolution`) counts too.
+        """
+        if not self.running:
+            return None
+        elapsed = self.phase_elapsed
+        delay = self.current_phase_duration - elapsed
+        if resolution:
+            delay = min(delay, (delay % resolution) or resolution)
+        return max(delay, 0.0)
+
+    @property
+    def day_offset(self):
+        """Position in the nominal day; extended work counts as the end of the last phase"""
+        if self.state == DONE:
+            return self.timeline.day_length
+        if self.break_active:
+            return self.timeline.offset_of(self.session, self.timeline.break_phase, self.phase_elapsed)
+        if self.state in (EXTENDED, AWAIT_BREAK):
+            return self.timeline.offset_of(self.session, self.timeline.break_phase)
+        return self.timeline.offset_of(self.session, self.work_phase, min(self.phase_elapsed, self.current_phase_duration))
+
+    def projected_end(self):
+        """Seconds until the last break of the day ends, assuming no further snoozes"""
+        remaining = self.timeline.remaining_after(self.day_offset)
+        if self.state == EXTENDED:
+            remaining += self.remaining
+        return remaining
+
+    @property
+    def break_active(self):
+        return self.state in BREAK_STATES
+
+    @property
+    def pending_prompt(self):
+        """The question waiting for an answer ("focus_check"/"snooze_prompt"), or None"""
+        if self.state != PROMPT:
+            return None
+        return "focus_check" if self.work_phase + 1 < self.total_phases else "snooze_prompt"
+
+    def _run(self):
+        self._anchor = self.clock()
+
+    def _halt(self, delta=None):
+        """Stop the clock, folding `delta` seconds (default: all) into the counters"""
+        if self._anchor is None:
+            return
+        if delta is None:
+            delta = self._delta()
+        self._phase_base += delta
+        if self._counts_work():
+            self._session_base += delta
+            self._total_base += delta
+        self._anchor = None
+
+    def _reset_phase(self, duration):
+        self._halt()
+        self.current_phase_duration = duration
+        self._phase_base = 0.0
+
+    def _emit(self, event):
+        for listener in self.listeners:
+            listener(event, self)
+
+    # -- Selection ----------------------------------------------------------
+
+    def select_session(self, idx):
+        self._halt()
+        self.session = idx
+        self.work_phase = 0
+        self.snooze_count = 0
+        self.paused = False
+        self.popup_active = False
+        self._session_base = 0.0
+        self._total_base = 0.0
+        self.state = IDLE
+        self._reset_phase(self.timeline.phase_seconds[0])
+        self._emit("session_selected")
+
+    def select_phase(self, idx):
+        self._halt()
+        self.work_phase = idx
+        self.snooze_count = 0
+        self.paused = False
+        self.popup_active = False
+        self.state = IDLE
+        self._reset_phase(self.timeline.phase_seconds[idx])
+        self._emit("phase_selected")
+
+    def seek(self, offset):
+        """Jump to `offset` seconds into the nominal day and keep running from there"""
+        session, phase, remaining = self.timeline.locate(offset)
+        self._halt()
+        self.paused = False
+        self.popup_active = False
+        self.snooze_count = 0
+        if session >= self.daily_sessions:
+            self.session = self.daily_sessions
+            self._session_base = 0.0
+            self._total_base = float(self.timeline.work_before(self.daily_sessions))
+            self.state = DONE
+            self._emit("finished")
+            return
+        duration = self.timeline.duration(session, phase)
+        self.session = session
+        self.current_phase_duration = duration
+        self._phase_base = duration - remaining
+        if phase == self.timeline.break_phase:
+            self.work_phase = self.total_phases - 1
+            self._session_base = float(self.timeline.work_per_session)
+            self.state = BREAK
+        else:
+            self.work_phase = phase
+            self._session_base = self.timeline.phase_starts[phase] + self._phase_base
+            self.state = WORKING
+        self._total_base = self.timeline.work_before(session) + self._session_base
+        self._run()
+        self._emit("seeked")
+
+    def restore(self, saved, now=None):
+        """Continue from a checkpointed TimerState.
+
+        If the clock was running when the checkpoint was taken, the wall
+        time since then counts as elapsed, so the phase ends when it would
+        have without the interruption.
+        """
+        if saved.session > self.daily_sessions or saved.work_phase >= self.total_phases:
+            raise ValueError("checkpoint does not match the current config")
+        self._halt()
+        self.state = saved.state
+        self.session = saved.session
+        self.work_phase = saved.work_phase
+        self.snooze_count = saved.snooze_count
+        self.current_phase_duration = saved.phase_duration
+        self._phase_base = saved.phase_elapsed
+        self._session_base = saved.session_elapsed
+        self._total_base = saved.total_work_elapsed
+        self.paused = saved.paused
+        self._was_running = saved.running
+        self.popup_active = False
+        if saved.running and not saved.paused:
+            downtime = max((time.time() if now is None else now) - saved.saved_at, 0.0)
+            self._run()
+            self._anchor -= downtime
+        self._emit("restored")
+        if self.state == PROMPT:
+            # The prompt died with the old process; ask again
+            if self.work_phase + 1 < self.total_phases:
+                self.show_work_confirmation()
+            else:
+                self.handle_last_phase_end()
+
+    def fast_forward(self, seconds):
+        self.seek(self.day_offset + seconds)
+
+    # -- Controls -----------------------------------------------------------
+
+    def toggle(self):
+        """Main button: start whatever is pending, otherwise pause/resume"""
+        if self.paused or self.running:
+            self.toggle_pause()
+        elif self.state == AWAIT_SESSION:
+            self.start_next_session()
+        elif self.state == AWAIT_BREAK:
+            self.handle_session_break()
+        elif self.state != DONE:
+            self.start_phase(self.work_phase)
+
+    def toggle_pause(self):
+        if not self.paused:
+            self._was_running = self.running
+            self._halt()
+            self.paused = True
+            self._emit("paused")
+        else:
+            self.paused = False
+            if self._was_running:
+                self._run()
+            self._emit("resumed")
+
+    def skip(self):
+        """End the running phase, snooze or break now, as if its time were up.
+
+        Only the time actually spent counts as work.
+        """
+        if not self.running:
+            return
+        self._phase_base += self.current_phase_duration - self.phase_elapsed
+        self.tick()
+
+    def stop_session(self):
+        """End the current session immediately, skip the break and move on"""
+        self._halt()
+        self.paused = False
+        self.popup_active = False
+        self.snooze_count = 0
+        self._session_base = 0.0
+        self.work_phase = 0
+        self.session += 1
+        self.state = IDLE
+        self._reset_phase(self.timeline.phase_seconds[0])
+        if self.session >= self.daily_sessions:
+            self.state = DONE
+            self._emit("finished")
+            self.notify("Pomodoro Finished", "All sessions complete!")
+            return
+        self._emit("stopped")
+
+    # -- Transitions --------------------------------------------------------
+
+    def start_phase(self, phase_idx):
+        if phase_idx >= self.total_phases:
+            self.handle_session_break()
+            return
+        self.paused = False
+        self.popup_active = False
+        self.work_phase = phase_idx
+        self._reset_phase(self.timeline.phase_seconds[phase_idx])
+        self.state = WORKING
+        self._run()
+        self._emit("phase_started")
+        self.notify(
+            "Work Started",
+            f"Only {self.work_phases[phase_idx]} minutes to go",
+            timeout=8000
+        )
+
+    def start_snooze(self):
+        """Start an extended work period"""
+        self.paused = False
+        self.popup_active = False
+        self._reset_phase(self.timeline.snooze_seconds)
+        self.state = EXTENDED
+        self._run()
+        self._emit("snooze_started")
+        self.notify(
+            "Extended Work",
+            f"Starting {self.snooze_interval} minutes of extended work",
+            timeout=3000
+        )
+
+    def handle_session_break(self):
+        self.paused = False
+        self.popup_active = False
+        self._reset_phase(self.timeline.break_seconds[self.session])
+        self.state = BREAK
+        self._run()
+        self._emit("break_started")
+        self.play_sound("gong")
+        self.notify("Session complete", "Break started!")
+
+    def start_next_session(self):
+        self._halt()
+        self.paused = False
+        self.session += 1
+        if self.session >= self.daily_sessions:
+            self.state = DONE
+            self._emit("finished")
+            self.notify("Pomodoro Finished", "All sessions complete!")
+            return
+        self.work_phase = 0
+        self.snooze_count = 0
+        self._session_base = 0.0
+        self.state = IDLE
+        self._emit("session_started")
+        self.play_sound("pling")
+        self.notify("Break's Over", "Break's over, back to work. Session starting now!")
+        self.start_phase(self.work_phase)
+
+    def show_work_confirmation(self):
+        self.state = PROMPT
+        self.popup_active = True
+        self._emit("focus_check")
+        self.play_sound("pling")
+        self.notify(
+            "Focus Check",
+            "Did you focus the past minutes?",
+            [("focus_yes", "Yes"), ("focus_no", "No")]
+        )
+
+    def show_snooze_dialog(self):
+        self.state = PROMPT
+        self.popup_active = True
+        self._emit("snooze_prompt")
+        self.play_sound("pling")
+        self.notify(
+            "Snooze?",
+            f"Continue working for {self.snooze_interval} more minutes?",
+            [("snooze_yes", "Yes"), ("snooze_no", "No")],
+            timeout=15000
+        )
+
+    def handle_last_phase_end(self):
+        """Handle the end of the last phase in a session"""
+        if self.snooze_count < self.max_snoozes:
+            self.show_snooze_dialog()
+        elif self.auto_start_breaks:
+            self.handle_session_break()
+        else:
+            self.state = AWAIT_BREAK
+            self._emit("break_pending")
+            self.notify("Session complete", "Click 'Start Break' to begin break")
+
+    def handle_action(self, action_id):
+        """Apply the answer to a focus check or snooze prompt"""
+        if ACTION_PROMPTS.get(action_id) != self.pending_prompt:
+            # A late answer (e.g. a notification clicked after the prompt
+            # was already answered elsewhere) must not advance twice
+            return
+        self._emit(action_id)
+        if action_id == "focus_yes":
+            self.work_phase += 1
+            if self.work_phase >= self.total_phases:
+                self.handle_session_break()
+            else:
+                self.start_phase(self.work_phase)
+        elif action_id == "focus_no":
+            self.handle_session_break()
+        elif action_id == "snooze_yes":
+            self.snooze_count += 1
+            self.start_snooze()
+        elif action_id == "snooze_no":
+            self.handle_session_break()
+        self.popup_active = False
+
+    def reconcile(self, gap):
+        """Tick after `gap` seconds went by unseen (a suspend or a stall).
+
+        What the gap counts for follows the `catch_up` config key:
+        - hold: like any late tick, the running phase, snooze or break ends
+          at its boundary and the time past it is dropped
+        - pause: the gap does not count, as if the timer had been paused
+        - replay: the gap counts in full; every boundary it spans is passed
+          in one step each, prompts taking their default answer, until the
+          timer waits for the user or the gap is used up. Only the last
+          notification and sound are delivered.
+        Returns the number of boundaries passed.
+        """
+        if not self.running:
+            return 0
+        if self.catch_up == "pause":
+            self._anchor += min(gap, self._delta())
+        elif self.catch_up == "replay":
+            return self._replay()
+        crossed = int(self.remaining == 0)
+        self.tick()
+        return crossed
+
+    def _replay(self):
+        notify, play_sound = self.notify, self.play_sound
+        notes, sounds = [], []
+        self.notify = lambda *args, **kwargs: notes.append((args, kwargs))
+        self.play_sound = sounds.append
+        crossed = 0
+        try:
+            while self.running:
+                overshoot = self.phase_elapsed - self.current_phase_duration
+                if overshoot < 0:
+                    break
+                self.tick()
+                crossed += 1
+                if self.state == PROMPT:
+                    self.handle_action(DEFAULT_ANSWERS[self.pending_prompt])
+                if self.running:
+                    # The time past the boundary belongs to what started there
+                    self._anchor -= overshoot
+        finally:
+            self.notify, self.play_sound = notify, play_sound
+        if sounds:
+            play_sound(sounds[-1])
+        if notes:
+            args, kwargs = notes[-1]
+            notify(*args, **kwargs)
+        return crossed
+
+    def tick(self):
+        """Advance the state machine to the current clock reading"""
+        if not self.running:
+            return
+        overshoot = self.phase_elapsed - self.current_phase_duration
+        if overshoot < 0:
+            return
+        # Clamp the counters to the exact boundary so a late tick never
+        # credits more than the configured duration.
+        self._halt(self._delta() - overshoot)
+        if self.state == BREAK:
+            if self.auto_start_sessions:
+                self.start_next_session()
+            else:
+                self.state = AWAIT_SESSION
+                self._emit("break_over")
+                self.play_sound("pling")
+                self.notify("Break's over", "Click 'Start Next Session' to begin")
+        elif self.work_phase + 1 < self.total_phases:
+            self.show_work_confirmation()
+        else:
+            self.handle_last_phase_end()
@@ -0,0 +1,220 @@
+import argparse
+import itertools
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from array import array
+from paths import runtime_dir
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+LEVEL_NAMES = {value: name.upper() for name, value in LEVELS.items()}
+
+
+def default_dump_path(pid=None):
+    return os.path.join(runtime_dir(), f"trace-{pid or os.getpid()}.txt")
+
+
+def add_trace_arguments(parser):
+    parser.add_argument('--trace-level', choices=list(LEVELS), default='info',
+                        help='Lowest level kept in the in-memory trace (default: info)')
+    parser.add_argument('--trace-file',
+                        help='Also append trace records to this file from a background thread')
+
+
+class Tracer:
+    """Structured, level-filtered event trace kept in a fixed-size ring.
+
+    Recording stores the format string and its arguments in pre-allocated
+    slots; nothing is formatted or written on the calling thread, and
+    records below `level` are dropped after one comparison. Once the ring
+    is full the oldest records are overwritten. A background thread can
+    append new records to a file, and dump() writes the whole ring on
+    demand (SIGUSR1, `python tracer.py PID`, or the daemon's `trace` command).
+    """
+
+    def __init__(self, capacity=4096, level=INFO):
+        self.capacity = capacity
+        self.level = level
+        self.seqs = array('q', [-1]) * capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.levels = array('B', bytes(capacity))
+        self.sources = [None] * capacity
+        self.messages = [None] * capacity
+        self.args = [None] * capacity
+        self._counter = itertools.count()
+        self._next = 0
+        self._flushed = 0
+        self._path = None
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def configure(self, level='info', path=None, flush_interval=1.0):
+        self.level = LEVELS[level]
+        if path and self._thread is None:
+            self._path = path
+            self._flush_interval = flush_interval
+            self._thread = threading.Thread(target=self._run, name="trace-flush", daemon=True)
+            self._thread.start()
+
+    def record(self, level, source, message, *args):
+        if level < self.level:
+            return
+        # next() on a count is atomic under the GIL, so threads never share a slot
+        seq = next(self._counter)
+        slot = seq % self.capacity
+        self.seqs[slot] = -1
+        self.times[slot] = time.time()
+        self.levels[slot] = level
+        self.sources[slot] = source
+        self.messages[slot] = message
+        self.args[slot] = args
+        self.seqs[slot] = seq
+        self._next = seq + 1
+
+    def debug(self, source, message, *args):
+        if DEBUG >= self.level:
+            self.record(DEBUG, source, message, *args)
+
+    def info(self, source, message, *args):
+        if INFO >= self.level:
+            self.record(INFO, source, message, *args)
+
+    def warning(self, source, message, *args):
+        self.record(WARNING, source, message, *args)
+
+    def error(self, source, message, *args):
+        self.record(ERROR, source, message, *args)
+
+    def format(self, seq):
+        """Text of record `seq`, or None if it was overwritten meanwhile"""
+        slot = seq % self.capacity
+        if self.seqs[slot] != seq:
+            return None
+        stamp = time.strftime('%H:%M:%S', time.localtime(self.times[slot]))
+        millis = int(self.times[slot] * 1000) % 1000
+        message, args = self.messages[slot], self.args[slot]
+        try:
+            text = message % args if args else message
+        except (TypeError, ValueError):
+            text = f"{message} {args!r}"
+        if self.seqs[slot] != seq:
+            return None
+        return f"{stamp}.{millis:03} {LEVEL_NAMES.get(self.levels[slot], '?'):7} {self.sources[slot]}: {text}"
+
+    def lines(self, start=None):
+        """Formatted records still in the ring, oldest first"""
+        end = self._next
+        first = max(end - self.capacity, 0 if start is None else start)
+        for seq in range(first, end):
+            line = self.format(seq)
+            if line is not None:
+                yield line
+
+    def dump(self, path=None):
+        """Write the whole ring to `path` (default: default_dump_path()) and return the path"""
+        path = path or default_dump_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            for line in self.lines():
+                f.write(line + "\n")
+        os.replace(tmp, path)
+        return path
+
+    def dump_on_signal(self, signum=signal.SIGUSR1):
+        """Dump the ring to default_dump_path() whenever `signum` arrives.
+
+        Python runs signal handlers only when the main thread executes
+        Python code, which can be minutes away in an idle Qt loop, so the
+        signal is also forwarded through a wakeup fd to a small thread.
+        """
+        signal.signal(signum, lambda *args: None)
+        receiver, sender = socket.socketpair()
+        sender.setblocking(False)
+        try:
+            previous = signal.set_wakeup_fd(sender.fileno(), warn_on_full_buffer=False)
+        except ValueError:  # not the main thread
+            previous = None
+        if previous is None or previous != -1:
+            if previous is not None:
+                # Someone (e.g. an asyncio loop) already owns the wakeup fd
+                signal.set_wakeup_fd(previous)
+            signal.signal(signum, lambda *args: self.request_dump())
+            receiver.close()
+            sender.close()
+            return
+        self._signal_socket = sender
+
+        def wait_for_signal():
+            while True:
+                data = receiver.recv(64)
+                if signum in data:
+                    self.request_dump()
+
+        threading.Thread(target=wait_for_signal, name="trace-signal", daemon=True).start()
+
+    def request_dump(self):
+        try:
+            self.dump()
+        except OSError as e:
+            self.error("trace", "dump failed: %s", e)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self._flush()
+
+    def _flush(self):
+        end = self._next
+        if end == self._flushed:
+            return
+        lost = max(end - self.capacity - self._flushed, 0)
+        try:
+            with open(self._path, 'a') as f:
+                if lost:
+                    f.write(f"... {lost} trace records overwritten before they were flushed\n")
+                for line in self.lines(self._flushed):
+                    f.write(line + "\n")
+        except OSError:
+            return
+        self._flushed = end
+
+    def close(self):
+        if self._thread is not None:
+            self._flush()
+
+
+tracer = Tracer()
+
+
+def trace_event(event, engine):
+    """Engine listener recording every transition"""
+    tracer.info("engine", "%s: session %d phase %d at %.1fs of %ds", event, engine.session + 1,
+                engine.work_phase + 1, engine.phase_elapsed, engine.current_phase_duration)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Dump the trace ring of a running timer')
+    parser.add_argument('pid', type=int, help='Process id of main.py')
+    args = parser.parse_args()
+    path = default_dump_path(args.pid)
+    before = os.path.getmtime(path) if os.path.exists(path) else None
+    os.kill(args.pid, signal.SIGUSR1)
+    deadline = time.monotonic() + 2.0
+    while time.monotonic() < deadline:
+        if os.path.exists(path) and os.path.getmtime(path) != before:
+            break
+        time.sleep(0.02)
+    else:
+        print(f"Error: process {args.pid} did not write '{path}'")
+        sys.exit(1)
+    with open(path) as f:
+        sys.stdout.write(f.read())
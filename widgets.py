@@ -0,0 +1,182 @@
+from PyQt5.QtCore import Qt, QObject, QRect, QSize, QTimer, pyqtProperty, pyqtSignal
+from PyQt5.QtGui import QColor, QIcon, QPainter, QPalette
+from PyQt5.QtWidgets import QSizePolicy, QSystemTrayIcon, QWidget
+from notifications import default_action
+
+
+class StepStrip(QWidget):
+    """One custom-painted row of numbered steps followed by a show-more arrow.
+
+    Stands in for a QPushButton per session or phase: it is a single widget
+    whatever the config size, and layout and paint cost follow the number of
+    cells actually on screen. Collapsed, it shows the first `revealed` cells;
+    expanded, all of them.
+    """
+
+    selected = pyqtSignal(int)
+
+    CELL = 50
+    ARROW = 30
+    SPACING = 6
+
+    def __init__(self, count, parent=None):
+        super().__init__(parent)
+        self.count = count
+        self.current = 0
+        self.revealed = min(1, count)
+        self.expanded = False
+        self._selected_color = QColor("green")
+        self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Fixed)
+
+    def set_count(self, count):
+        if count == self.count:
+            return
+        self.count = count
+        self.revealed = min(self.revealed, count)
+        self.current = min(self.current, max(0, count - 1))
+        self._relayout()
+
+    def getSelectedColor(self):
+        return self._selected_color
+
+    def setSelectedColor(self, color):
+        self._selected_color = QColor(color)
+        self.update()
+
+    # Settable from the stylesheet as qproperty-selectedColor
+    selectedColor = pyqtProperty(QColor, getSelectedColor, setSelectedColor)
+
+    def visible_count(self):
+        return self.count if self.expanded else self.revealed
+
+    def sizeHint(self):
+        return QSize(self.visible_count() * (self.CELL + self.SPACING) + self.ARROW, self.CELL)
+
+    def minimumSizeHint(self):
+        return self.sizeHint()
+
+    def cell_rect(self, idx):
+        return QRect(idx * (self.CELL + self.SPACING), 0, self.CELL, self.CELL)
+
+    def arrow_rect(self):
+        return QRect(self.visible_count() * (self.CELL + self.SPACING), 0, self.ARROW, self.CELL)
+
+    def _relayout(self):
+        self.updateGeometry()
+        self.update()
+
+    def set_current(self, idx):
+        if idx == self.current:
+            return
+        old, self.current = self.current, idx
+        # Repaint just the two cells whose highlight changed
+        self.update(self.cell_rect(old))
+        self.update(self.cell_rect(idx))
+
+    def reveal(self, idx):
+        """Make sure cells up to and including `idx` are shown"""
+        revealed = min(idx + 1, self.count)
+        if revealed > self.revealed:
+            self.revealed = revealed
+            if not self.expanded:
+                self._relayout()
+
+    def collapse(self, revealed=None):
+        """Leave expanded mode, optionally showing only the first `revealed` cells"""
+        changed = self.expanded
+        self.expanded = False
+        if revealed is not None and revealed != self.revealed:
+            self.revealed = min(revealed, self.count)
+            changed = True
+        if changed:
+            self._relayout()
+
+    def toggle_expanded(self):
+        if self.expanded:
+            # Collapse to show only current and previous
+            self.collapse(self.current + 1)
+        else:
+            self.expanded = True
+            self._relayout()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        palette = self.palette()
+        exposed = event.rect()
+        step = self.CELL + self.SPACING
+        first = max(exposed.left() // step, 0)
+        last = min(exposed.right() // step + 1, self.visible_count())
+        for idx in range(first, last):
+            fill = self._selected_color if idx == self.current else palette.color(QPalette.Button)
+            self._draw_cell(painter, palette, self.cell_rect(idx), fill, str(idx + 1))
+        arrow = self.arrow_rect()
+        if exposed.intersects(arrow):
+            self._draw_cell(painter, palette, arrow, palette.color(QPalette.Button),
+                            "▼" if self.expanded else "▶")
+
+    def _draw_cell(self, painter, palette, rect, fill, text):
+        rect = rect.adjusted(1, 1, -1, -1)
+        painter.setPen(palette.color(QPalette.Mid))
+        painter.setBrush(fill)
+        painter.drawRoundedRect(rect, 4, 4)
+        painter.setPen(palette.color(QPalette.ButtonText))
+        painter.drawText(rect, Qt.AlignCenter, text)
+
+    def mouseReleaseEvent(self, event):
+        if event.button() != Qt.LeftButton:
+            return
+        pos = event.pos()
+        if self.arrow_rect().contains(pos):
+            self.toggle_expanded()
+            return
+        idx = pos.x() // (self.CELL + self.SPACING)
+        if idx < self.visible_count() and self.cell_rect(idx).contains(pos):
+            self.selected.emit(idx)
+
+
+class TrayBackend(QObject):
+    """Notification backend showing Qt tray balloons.
+
+    Balloons cannot carry buttons, so clicking a prompt's balloon picks its
+    first action and letting it expire picks the default. Requests may come
+    from the asyncio thread; the signal hops them onto the GUI thread.
+    """
+
+    name = "tray"
+    message_requested = pyqtSignal(object)
+
+    def __init__(self, on_action, tray_icon):
+        super().__init__()
+        self.on_action = on_action
+        self.tray_icon = tray_icon
+        self._prompt = None
+        self.message_requested.connect(self._show_message)
+        self.tray_icon.messageClicked.connect(self._clicked)
+
+    async def show(self, request):
+        self.message_requested.emit(request)
+
+    def _show_message(self, request):
+        self.tray_icon.showMessage(request.title, request.message,
+                                   QSystemTrayIcon.Information, request.display_timeout)
+        if request.actions:
+            self._prompt = request
+            QTimer.singleShot(request.display_timeout, lambda: self._expire(request))
+
+    def _clicked(self):
+        if self._prompt is not None:
+            request, self._prompt = self._prompt, None
+            self.on_action(request.actions[0][0])
+
+    def _expire(self, request):
+        if self._prompt is request:
+            self._prompt = None
+            self.on_action(default_action(request.actions))
+
+
+def create_tray_backend(on_action, parent=None, tray_icon=None):
+    if tray_icon is None:
+        tray_icon = QSystemTrayIcon(QIcon("tomato.png"), parent)
+        tray_icon.show()
+    return TrayBackend(on_action, tray_icon)
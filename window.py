@@ -0,0 +1,756 @@
+from startup import profile
+import threading
+import time
+import math
+import os
+from collections import deque
+from control import execute, status
+from export import status_line
+from gaps import GapDetector
+from instance import CLIENT_TIMEOUT
+from tracer import trace_event, tracer
+from metrics import INTERVAL_BUCKETS, WRITE_INTERVAL, timed
+from checkpoint import CheckpointWriter, load_checkpoint, snapshot
+from journal import JournalWriter
+from timer_engine import (
+    TimerEngine, IDLE, WORKING, EXTENDED, PROMPT, BREAK, AWAIT_BREAK, AWAIT_SESSION, DONE
+)
+from config import ConfigError, ConfigWatch, load_config, read_config
+from PyQt5.QtGui import QIcon
+from PyQt5.QtWidgets import (
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QMessageBox,
+    QCheckBox, QMenu, QSystemTrayIcon
+)
+from PyQt5.QtCore import QTimer, Qt, QEvent, QSocketNotifier, pyqtSignal, QObject
+profile.mark("PyQt5 imports")
+# asyncio, the audio engine, qasync and the notification backends are imported
+# on first use, after the window is on screen.
+from render import LabelRenderer, format_time
+from scheduler import StallDetector, WakeupScheduler
+from widgets import StepStrip, create_tray_backend
+profile.mark("Qt app modules")
+
+# Main button label and the value of its "state" style property
+MAIN_BUTTON_STATES = {
+    IDLE: ("Start Working", "idle"),
+    WORKING: ("Working...", "working"),
+    EXTENDED: ("Working...", "working"),
+    PROMPT: ("Working...", "working"),
+    BREAK: ("Break time", "break"),
+    AWAIT_BREAK: ("Start Break", "pending"),
+    AWAIT_SESSION: ("Start Next Session", "pending"),
+    DONE: ("All sessions complete!", "done"),
+}
+
+# Compiled once for the whole application; state changes only flip the
+# dynamic properties below and re-polish the widget that changed.
+STYLESHEET = """
+QPushButton#mainButton { color: white; font-size: 18px; background-color: red; }
+QPushButton#mainButton[state="working"] { background-color: purple; }
+QPushButton#mainButton[state="extended"] { background-color: orange; }
+QPushButton#mainButton[state="paused"] { background-color: orange; }
+QPushButton#mainButton[state="break"] { background-color: green; }
+QPushButton#mainButton[state="pending"] { background-color: blue; }
+QPushButton#mainButton[state="done"] { background-color: gray; }
+QLabel#slotTimer { font-size: 24px; font-weight: bold; }
+QLabel#totalTimer { font-size: 20px; }
+QLabel#breakTime { font-size: 18px; }
+QLabel#heading { font-size: 16px; font-weight: bold; }
+StepStrip { font-size: 16px; font-weight: bold; qproperty-selectedColor: green; }
+"""
+
+# Seconds between tray tooltip updates
+TRAY_RESOLUTION = 60
+# Attributes pointing into the widget tree that init_ui builds
+VIEW_WIDGETS = (
+    "layout", "main_button", "pause_button", "stop_button", "slot_timer_label",
+    "total_timer_label", "auto_start_breaks_cb", "auto_start_sessions_cb",
+    "break_time_label", "session_strip", "phase_strip",
+)
+
+
+def set_style_property(widget, name, value):
+    """Flip a dynamic style property, re-polishing only this widget and only on change"""
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+
+
+class NotificationHandler(QObject):
+    action_triggered = pyqtSignal(str, float)
+
+    def __init__(self):
+        super().__init__()
+        self.action_triggered.connect(self.handle_action)
+        # Seconds from the notification callback firing to handle_action running
+        self.action_latencies = deque(maxlen=100)
+        # Set when metrics are on
+        self.delay_histogram = None
+        self.handle_histogram = None
+
+    def handle_action(self, action_id, sent_at=None):
+        if sent_at is not None:
+            self.action_latencies.append(time.monotonic() - sent_at)
+            if self.delay_histogram is not None:
+                self.delay_histogram.observe(time.monotonic() - sent_at)
+        tracer.info("action", "received %s", action_id)
+        if self.handle_histogram is None:
+            self.parent().engine.handle_action(action_id)
+        else:
+            timed(self.handle_histogram, self.parent().engine.handle_action, action_id)
+
+    def latency_summary(self):
+        if not self.action_latencies:
+            return "no actions"
+        mean = sum(self.action_latencies) / len(self.action_latencies)
+        return (f"{len(self.action_latencies)} actions, mean {mean * 1000:.2f} ms, "
+                f"max {max(self.action_latencies) * 1000:.2f} ms")
+
+
+class TimerTray(QSystemTrayIcon):
+    """Tray icon showing the remaining time in its tooltip, with the main
+    controls in its context menu. While the window is released this is all
+    that is left of the UI; clicking the icon brings the window back."""
+
+    def __init__(self, window):
+        super().__init__(QIcon("tomato.png"), window)
+        self.window = window
+        self.menu = QMenu()
+        self.show_action = self.menu.addAction("Show window", window.toggle_window)
+        self.pause_action = self.menu.addAction("Pause", window.toggle_pause)
+        self.menu.addAction("Skip", window.skip)
+        self.menu.addAction("Stop", window.stop_session)
+        self.menu.addSeparator()
+        self.menu.addAction("Quit", window.quit)
+        self.setContextMenu(self.menu)
+        self.activated.connect(self._activated)
+        self._tooltip = None
+
+    def _activated(self, reason):
+        if reason == QSystemTrayIcon.Trigger:
+            self.window.toggle_window()
+
+    def refresh(self, engine):
+        remaining = math.ceil(engine.remaining / TRAY_RESOLUTION) * TRAY_RESOLUTION
+        tooltip = f"Dynamic Pomodoro Timer\n{status_line(engine, remaining)}"
+        if tooltip != self._tooltip:
+            self._tooltip = tooltip
+            self.setToolTip(tooltip)
+        pause_text = "Resume" if engine.paused else "Pause"
+        if self.pause_action.text() != pause_text:
+            self.pause_action.setText(pause_text)
+        show_text = "Hide window" if self.window.view is not None else "Show window"
+        if self.show_action.text() != show_text:
+            self.show_action.setText(show_text)
+
+
+class PomodoroTimer(QWidget):
+    def __init__(self, config_path, loop=None, notifier='auto', history=None,
+                 checkpoint=None, resume=False, profile_startup=False, exporter=None,
+                 silent=False, metrics=None, metrics_path=None, tray=False, instance=None):
+        super().__init__()
+        self.config_path = config_path
+        self.config = load_config(config_path)
+        self.profile_startup = profile_startup
+        self.exporter = exporter
+        self.metrics = metrics
+        self.metrics_path = metrics_path
+        # Sound, notification and event loop resources are created on first use
+        self.audio = None
+        self.silent = silent
+        self.notifier_name = notifier
+        self.notifier = None
+        self.notification_queue = None
+        self.loop = loop
+        self.loop_thread = None
+        self._painted = False
+        self._quitting = False
+        self.view = None
+        self._frame = None
+        self.engine = TimerEngine(
+            self.config,
+            notify=self.show_notification_sync,
+            play_sound=self.play_sound
+        )
+        self.engine.listeners.append(self.on_engine_event)
+        self.engine.listeners.append(trace_event)
+        profile.mark("config + engine")
+        self.journal = JournalWriter(history) if history else None
+        if self.journal is not None:
+            self.engine.listeners.append(self.journal.record)
+        self.checkpoint = CheckpointWriter(checkpoint) if checkpoint else None
+        if self.checkpoint is not None:
+            self.engine.listeners.append(self.save_checkpoint)
+        profile.mark("history + checkpoint")
+        tick_lag = None
+        if metrics is not None:
+            tick_lag = metrics.histogram(
+                'tick_lag_seconds', "How late update_timer wakeups fire compared to when they were due")
+        self.scheduler = WakeupScheduler(self.update_timer, self, lag_histogram=tick_lag)
+        self.gaps = GapDetector(metrics)
+        self.engine.listeners.append(self.gaps.on_engine_event)
+        self.renderer = LabelRenderer(self)
+        QApplication.instance().setStyleSheet(STYLESHEET)
+        self._rendered_key = None
+        self._rendered_labels = 0
+        # Create notification handler
+        self.notification_handler = NotificationHandler()
+        self.notification_handler.setParent(self)
+        if metrics is not None:
+            self.start_metrics()
+        self.tray = None
+        if tray and not QSystemTrayIcon.isSystemTrayAvailable():
+            print("Warning: no system tray available, showing the window instead")
+        elif tray:
+            self.tray = TimerTray(self)
+            self.tray.show()
+            # Closing a popup while the window is released must not quit
+            QApplication.instance().setQuitOnLastWindowClosed(False)
+        if self.tray is None:
+            self.init_ui()
+            profile.mark("widget tree")
+        else:
+            profile.mark("tray icon")
+            # Nothing gets painted, so bring up the services right away
+            self._painted = True
+            QTimer.singleShot(0, self.finish_startup)
+        if resume and checkpoint:
+            self.resume_from(checkpoint)
+        self.watch_config()
+        self.instance = instance
+        if instance is not None:
+            self._instance_notifier = QSocketNotifier(instance.fileno(), QSocketNotifier.Read, self)
+            self._instance_notifier.activated.connect(self.accept_clients)
+        self._clients = {}
+        if self.view is None:
+            self.update_timer()
+
+    def start_metrics(self):
+        metrics = self.metrics
+        self._tick_interval = metrics.histogram(
+            'tick_interval_seconds', "Time between update_timer calls", INTERVAL_BUCKETS)
+        self._last_tick = None
+        self.stall_detector = StallDetector(
+            metrics.histogram('qt_loop_lag_seconds', "Lateness of a 200 ms Qt timer, i.e. main loop stalls"),
+            metrics.counter('qt_loop_stalls_total', "Qt main loop stalls of 250 ms or more"),
+            self
+        )
+        self.notification_handler.delay_histogram = metrics.histogram(
+            'notification_action_delay_seconds', "From a notification answer to its handling on the GUI thread")
+        self.notification_handler.handle_histogram = metrics.histogram(
+            'handle_action_seconds', "Time spent in TimerEngine.handle_action")
+        if self.metrics_path:
+            self._metrics_timer = QTimer(self)
+            self._metrics_timer.timeout.connect(lambda: self.metrics.write(self.metrics_path))
+            self._metrics_timer.start(WRITE_INTERVAL * 1000)
+            self.metrics.write(self.metrics_path)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            profile.mark("first paint")
+            # The window is up: bring up the remaining services next
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        self.start_notifications()
+        self.start_audio()
+        if self.profile_startup:
+            print(profile.report())
+
+    def start_notifications(self):
+        """Create the notification backend, event loop and dispatch queue once"""
+        if self.notification_queue is not None:
+            return
+        import asyncio
+        from notifications import NotificationQueue
+        self.notifier = self.create_notifier(self.notifier_name)
+        profile.mark("notification backend")
+        if self.loop is None:
+            # Create event loop for async operations
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            # Start the event loop in a separate thread
+            self.loop_thread = threading.Thread(target=self._run_event_loop, daemon=True)
+            self.loop_thread.start()
+        # Otherwise asyncio already runs on the Qt event loop, no thread hop needed
+        self.notification_queue = NotificationQueue(self.notifier.show)
+        if self.loop_thread is None:
+            self.loop.create_task(self.notification_queue.run())
+        else:
+            asyncio.run_coroutine_threadsafe(self.notification_queue.run(), self.loop)
+        if self.metrics is not None:
+            from metrics import monitor_loop_lag
+            lag = self.metrics.histogram('asyncio_loop_lag_seconds', "Lateness of the asyncio loop running notifications")
+            asyncio.run_coroutine_threadsafe(monitor_loop_lag(lag), self.loop)
+        profile.mark("event loop")
+
+    def watch_config(self):
+        """Reload the config whenever the file is saved, without polling"""
+        try:
+            self.config_watch = ConfigWatch(self.config_path)
+        except (OSError, AttributeError) as e:
+            print(f"Warning: config hot-reload unavailable: {e}")
+            self.config_watch = None
+            return
+        self._config_notifier = QSocketNotifier(self.config_watch.fd, QSocketNotifier.Read, self)
+        self._config_notifier.activated.connect(self._config_changed)
+        # Editors often write a file in several steps; reload once they settle
+        self._config_reload_timer = QTimer(self)
+        self._config_reload_timer.setSingleShot(True)
+        self._config_reload_timer.timeout.connect(self.reload_config)
+
+    def _config_changed(self):
+        if self.config_watch.changed():
+            self._config_reload_timer.start(100)
+
+    def reload_config(self):
+        start = time.perf_counter()
+        try:
+            config = read_config(self.config_path)
+        except ConfigError as e:
+            print(f"Config reload rejected, keeping the current schedule: {e}")
+            return
+        self.config = config
+        self.engine.apply_config(config)
+        print(f"Config reloaded in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    def switch_config(self, path):
+        """Follow a different config file, as asked by a second launch"""
+        if os.path.abspath(path) == os.path.abspath(self.config_path):
+            return
+        read_config(path)
+        if self.config_watch is not None:
+            self._config_notifier.setEnabled(False)
+            self.config_watch.close()
+        self.config_path = path
+        self.watch_config()
+        self.reload_config()
+
+    def accept_clients(self):
+        for client in self.instance.accept():
+            notifier = QSocketNotifier(client.fileno(), QSocketNotifier.Read, self)
+            notifier.activated.connect(lambda _, client=client: self.serve_client(client))
+            self._clients[client] = notifier
+            QTimer.singleShot(int(CLIENT_TIMEOUT * 1000), lambda client=client: self.drop_client(client))
+
+    def serve_client(self, client):
+        if not client.serve(self.run_command):
+            self.drop_client(client)
+
+    def drop_client(self, client):
+        notifier = self._clients.pop(client, None)
+        if notifier is not None:
+            notifier.setEnabled(False)
+            notifier.deleteLater()
+            client.close()
+
+    def run_command(self, line):
+        """Reply to one control command forwarded by a second launch"""
+        words = line.split()
+        if words[:1] == ["show"]:
+            self.show_window()
+        elif words[:1] == ["config"] and len(words) == 2:
+            try:
+                self.switch_config(words[1])
+            except ConfigError as e:
+                return {'ok': False, 'error': f"config rejected: {e}"}
+        else:
+            return execute(self.engine, line)
+        return {'ok': True, 'status': status(self.engine)}
+
+    def resume_from(self, path):
+        start = time.perf_counter()
+        saved = load_checkpoint(path)
+        if saved is None:
+            print("No checkpoint to resume from, starting a new day")
+            return
+        try:
+            self.engine.restore(saved)
+        except ValueError as e:
+            print(f"Warning: cannot resume: {e}")
+            return
+        print(f"Resumed session {saved.session + 1}, phase {saved.work_phase + 1} "
+              f"in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    def save_checkpoint(self, event, engine):
+        self.checkpoint.save(snapshot(engine))
+
+    def create_notifier(self, name):
+        from notifications import available_backends, make_backend
+
+        def on_action(action_id):
+            # Use Qt's signal mechanism to handle the action in the main thread
+            self.notification_handler.action_triggered.emit(action_id, time.monotonic())
+        if name == 'auto':
+            name = available_backends()[0]
+            if name == 'memory' and QSystemTrayIcon.isSystemTrayAvailable():
+                name = 'tray'
+        if name == 'tray':
+            backend = create_tray_backend(on_action, self, self.tray)
+        else:
+            backend = make_backend(name, on_action)
+        print(f"Using {backend.name} notifications")
+        return backend
+
+    def _run_event_loop(self):
+        """Run the event loop in a separate thread"""
+        import asyncio
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def init_ui(self):
+        self.setWindowTitle("Dynamic Pomodoro Timer")
+        # Everything lives in one child widget, so the whole tree can be
+        # released while only the tray icon is up
+        self.view = QWidget(self)
+        self.layout = QVBoxLayout()
+        self.view.setLayout(self.layout)
+
+        # Main control button
+        self.main_button = QPushButton("Start Working")
+        self.main_button.setObjectName("mainButton")
+        self.main_button.setProperty("state", "idle")
+        self.main_button.clicked.connect(self.toggle_timer)
+        self.layout.addWidget(self.main_button)
+
+        # Pause and Stop buttons
+        button_row = QHBoxLayout()
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        button_row.addWidget(self.pause_button)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.clicked.connect(self.stop_session)
+        button_row.addWidget(self.stop_button)
+        self.layout.addLayout(button_row)
+
+        # Timer labels
+        self.slot_timer_label = QLabel("Phase: 00:00")
+        self.slot_timer_label.setAlignment(Qt.AlignCenter)
+        self.slot_timer_label.setObjectName("slotTimer")
+        self.layout.addWidget(self.slot_timer_label)
+        self.total_timer_label = QLabel("Total: 00:00")
+        self.total_timer_label.setAlignment(Qt.AlignCenter)
+        self.total_timer_label.setObjectName("totalTimer")
+        self.layout.addWidget(self.total_timer_label)
+
+        # Add auto-start checkboxes
+        checkbox_layout = QHBoxLayout()
+        self.auto_start_breaks_cb = QCheckBox("Auto-start breaks")
+        self.auto_start_breaks_cb.setChecked(self.engine.auto_start_breaks)
+        self.auto_start_breaks_cb.stateChanged.connect(self.toggle_auto_start_breaks)
+        checkbox_layout.addWidget(self.auto_start_breaks_cb)
+
+        self.auto_start_sessions_cb = QCheckBox("Auto-start sessions")
+        self.auto_start_sessions_cb.setChecked(self.engine.auto_start_sessions)
+        self.auto_start_sessions_cb.stateChanged.connect(self.toggle_auto_start_sessions)
+        checkbox_layout.addWidget(self.auto_start_sessions_cb)
+        self.layout.addLayout(checkbox_layout)
+
+        # Add break time display
+        self.break_time_label = QLabel("Break time: 00:00 / 00:00")
+        self.break_time_label.setAlignment(Qt.AlignCenter)
+        self.break_time_label.setObjectName("breakTime")
+        self.layout.addWidget(self.break_time_label)
+
+        # Session selection buttons
+        session_label = QLabel("Session:")
+        session_label.setAlignment(Qt.AlignCenter)
+        session_label.setObjectName("heading")
+        self.layout.addWidget(session_label)
+        
+        self.session_strip = StepStrip(self.engine.daily_sessions)
+        self.session_strip.selected.connect(self.select_session)
+        self.layout.addWidget(self.session_strip, alignment=Qt.AlignCenter)
+
+        # Phase selection buttons
+        phase_label = QLabel("Phase:")
+        phase_label.setAlignment(Qt.AlignCenter)
+        phase_label.setObjectName("heading")
+        self.layout.addWidget(phase_label)
+        
+        self.phase_strip = StepStrip(self.engine.total_phases)
+        self.phase_strip.selected.connect(self.select_phase)
+        self.layout.addWidget(self.phase_strip, alignment=Qt.AlignCenter)
+
+        self.refresh_view()
+        if self._frame is None:
+            self._frame = QVBoxLayout(self)
+            self._frame.setContentsMargins(0, 0, 0, 0)
+        self._frame.addWidget(self.view)
+        self.show()
+
+    def toggle_window(self):
+        if self.view is None:
+            self.show_window()
+        else:
+            self.release_window()
+
+    def show_window(self):
+        """Rebuild the widget tree if it was released and bring the window up"""
+        if self.view is None:
+            self.init_ui()
+        self.showNormal()
+        self.raise_()
+        self.activateWindow()
+        if self.tray is not None:
+            self.tray.refresh(self.engine)
+
+    def release_window(self):
+        """Hide into the tray and free the widget tree and native window"""
+        self.hide()
+        if self.view is None:
+            return
+        self.renderer.forget()
+        self._rendered_key = None
+        self._frame.removeWidget(self.view)
+        self.view.deleteLater()
+        self.view = None
+        for name in VIEW_WIDGETS:
+            setattr(self, name, None)
+        # show() creates the platform window and backing store again
+        self.destroy()
+        self.update_timer()
+
+    def quit(self):
+        self._quitting = True
+        self.close()
+        QApplication.instance().quit()
+
+    def skip(self):
+        self.engine.skip()
+
+    def highlight_selection(self):
+        self.session_strip.set_current(self.engine.session)
+        self.phase_strip.set_current(self.engine.work_phase)
+
+    def select_session(self, idx):
+        self.engine.select_session(idx)
+
+    def select_phase(self, idx):
+        self.engine.select_phase(idx)
+
+    def update_main_button(self, text, state):
+        if self.main_button.text() != text:
+            self.main_button.setText(text)
+        set_style_property(self.main_button, "state", state)
+
+    def toggle_timer(self):
+        self.engine.toggle()
+
+    def toggle_pause(self):
+        self.engine.toggle_pause()
+
+    def stop_session(self):
+        self.engine.stop_session()
+
+    def on_engine_event(self, event, engine):
+        """Re-render the view after a state transition of the engine"""
+        if self.view is not None:
+            self.refresh_view(event)
+        self.update_timers()
+        self.reschedule()
+        day_end = time.localtime(time.time() + engine.projected_end())
+        self.setToolTip(f"Projected end of day: {time.strftime('%H:%M', day_end)}")
+
+    def refresh_view(self, event=None):
+        engine = self.engine
+        if event == "config_reloaded":
+            self.session_strip.set_count(engine.daily_sessions)
+            self.phase_strip.set_count(engine.total_phases)
+            self.auto_start_breaks_cb.setChecked(engine.auto_start_breaks)
+            self.auto_start_sessions_cb.setChecked(engine.auto_start_sessions)
+        if event == "session_selected":
+            # Show all session buttons up to current session
+            self.session_strip.collapse(engine.session + 1)
+        if event in ("session_selected", "session_started"):
+            # Reset phase buttons visibility
+            self.session_strip.collapse()
+            self.phase_strip.collapse(1)
+        elif event == "phase_selected":
+            # Show all phase buttons up to current phase
+            self.phase_strip.collapse(engine.work_phase + 1)
+        elif event == "break_started":
+            # Show the next session button if it exists
+            self.session_strip.reveal(engine.session + 1)
+        self.session_strip.reveal(engine.session)
+        self.phase_strip.reveal(engine.work_phase)
+        self.pause_button.setText("Resume" if engine.paused else "Pause")
+        self.update_main_button(*self.main_button_state())
+        self.highlight_selection()
+
+    def main_button_state(self):
+        engine = self.engine
+        if engine.paused:
+            return "Paused", "paused"
+        if engine.state in (EXTENDED, PROMPT) and engine.snooze_count > 0:
+            return f"Extended work {engine.snooze_count}/{engine.max_snoozes}", "extended"
+        return MAIN_BUTTON_STATES[engine.state]
+
+    def update_timer(self):
+        if self.metrics is not None:
+            now = time.monotonic()
+            if self._last_tick is not None:
+                self._tick_interval.observe(now - self._last_tick)
+            self._last_tick = now
+        self.gaps.tick(self.engine, self.scheduler.due)
+        self.update_timers()
+        self.reschedule()
+
+    def is_watched(self):
+        """Whether anyone can currently see the labels tick"""
+        return (self.view is not None and self.isVisible() and not self.isMinimized()
+                and not self.visibleRegion().isEmpty())
+
+    def reschedule(self):
+        # Per-second wakeups only while visible; otherwise sleep until the
+        # next phase, snooze or break boundary, or the next change the tray
+        # tooltip or an exported panel status would show.
+        resolutions = [1] if self.is_watched() else []
+        if self.tray is not None:
+            resolutions.append(TRAY_RESOLUTION)
+        if self.exporter is not None:
+            resolutions.append(self.exporter.resolution)
+        self.scheduler.arm(self.engine.next_wakeup(min(resolutions, default=None)))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_timer()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.reschedule()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            if self.tray is not None and self.isMinimized():
+                # Minimizing with a tray icon releases the window as well
+                QTimer.singleShot(0, self.release_window)
+                return
+            self.update_timer()
+
+    def closeEvent(self, event):
+        if self.tray is not None and not self._quitting:
+            event.ignore()
+            self.release_window()
+            return
+        print(f"Scheduler: {self.scheduler.summary()}")
+        print(f"Clock gaps: {self.gaps.summary()}")
+        print(f"Notification actions: {self.notification_handler.latency_summary()}")
+        if self.notification_queue is not None:
+            print(f"Notification queue: {self.notification_queue.summary()}")
+        print(f"Renderer: {self.renderer.summary()}")
+        if self.exporter is not None:
+            print(f"Status export: {self.exporter.summary()}")
+        if self.metrics_path:
+            self.metrics.write(self.metrics_path)
+        if self.audio is not None:
+            print(f"Audio: {self.audio.summary()}")
+            self.audio.close()
+        tracer.close()
+        if self.journal is not None:
+            self.journal.close()
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+        if self.config_watch is not None:
+            self._config_notifier.setEnabled(False)
+            self.config_watch.close()
+        if self.instance is not None:
+            self._instance_notifier.setEnabled(False)
+            for client in list(self._clients):
+                self.drop_client(client)
+            self.instance.close()
+        if self.tray is not None:
+            self.tray.hide()
+        super().closeEvent(event)
+
+    def start_audio(self):
+        """Start the audio engine once; it decodes the cues in the background"""
+        if self.audio is None:
+            from audio import AudioEngine
+            self.audio = AudioEngine(silent=self.silent)
+            profile.mark("audio engine")
+        return self.audio
+
+    def play_sound(self, name):
+        self.start_audio().play(name)
+
+    def play_notification_sound(self):
+        self.play_sound("pling")
+
+    def handle_notification_action(self, action_id):
+        # This method is now handled by NotificationHandler
+        pass
+
+    def update_timers(self):
+        engine = self.engine
+        if self.exporter is not None:
+            self.exporter.update(engine)
+        if self.tray is not None:
+            self.tray.refresh(engine)
+        if self.view is None:
+            return
+        duration = engine.current_phase_duration
+        elapsed = min(int(engine.phase_elapsed), duration)
+        total_seconds = int(engine.total_work_elapsed)
+        key = (engine.state, elapsed, duration, total_seconds)
+        if key == self._rendered_key:
+            # Nothing visible changed since the last render
+            self.renderer.skip(self._rendered_labels)
+            return
+        self._rendered_key = key
+        remaining = duration - elapsed
+        total = format_time(total_seconds)
+        if engine.state == DONE:
+            texts = ((self.slot_timer_label, "Done!"),
+                     (self.total_timer_label, f"Total: {total}"),
+                     (self.break_time_label, "Break time: 00:00 / 00:00"))
+        elif engine.break_active:
+            texts = ((self.slot_timer_label, f"Break: {format_time(remaining)} / {format_time(duration)}"),
+                     (self.total_timer_label, f"Total: {total}"),
+                     (self.break_time_label,
+                      f"Break time: {format_time(elapsed)} / {format_time(duration)}"))
+        elif engine.state == IDLE:
+            texts = ((self.slot_timer_label, f"Phase: {format_time(remaining)} / {format_time(duration)}"),
+                     (self.total_timer_label, f"Total: {total}"))
+        else:
+            texts = ((self.slot_timer_label,
+                      f"Only {format_time(remaining)} to go of {format_time(duration)}!"),
+                     (self.total_timer_label, f"Already worked for {total}! \nKeep it up!"),
+                     # Clear break time display during work
+                     (self.break_time_label, "Break time: 00:00 / 00:00"))
+        for label, text in texts:
+            self.renderer.set_text(label, text)
+        self._rendered_labels = len(texts)
+
+    def show_auto_close_popup(self, title, message, duration_ms=3000):
+        self.play_notification_sound()
+        self.popup = QMessageBox(self)
+        self.popup.setWindowTitle(title)
+        self.popup.setText(message)
+        self.popup.setStandardButtons(QMessageBox.Ok)
+        self.popup.setWindowModality(Qt.NonModal)
+        self.popup.show()
+        QTimer.singleShot(duration_ms, self.popup.close)
+        self.popup.finished.connect(lambda: setattr(self, 'popup', None))
+
+    def show_notification_sync(self, title, message, actions=None, timeout=None):
+        """Hand a notification to the dispatch queue without blocking"""
+        if self.notification_queue is None:
+            self.start_notifications()
+        if self.loop_thread is None:
+            # Same thread: enqueue directly on the integrated loop
+            self.notification_queue.put(title, message, actions, timeout)
+            return
+        # Use call_soon_threadsafe to safely enqueue on the event loop thread
+        self.loop.call_soon_threadsafe(self.notification_queue.put, title, message, actions, timeout)
+
+    def toggle_auto_start_breaks(self, state):
+        self.engine.auto_start_breaks = bool(state)
+
+    def toggle_auto_start_sessions(self, state):
+        self.engine.auto_start_sessions = bool(state)